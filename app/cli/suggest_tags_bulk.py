@@ -0,0 +1,82 @@
+"""
+Bulk tag suggestion for catalog onboarding.
+
+    python -m app.cli.suggest_tags_bulk artworks.jsonl tags.jsonl [--concurrency 8] [--retries 2]
+
+Input: one TagSuggestRequest per line (an extra "id" is echoed back).
+Output: one line per record, in input order (see app/services/tag_bulk.py).
+
+Progress is checkpointed to <output>.checkpoint after every record. Running
+the same command again resumes where it stopped; delete the output and the
+checkpoint to start over.
+"""
+import sys
+import json
+import asyncio
+import argparse
+from pathlib import Path
+
+from app.services.tag_bulk import iter_file_lines, jsonl, suggest_tags_bulk
+from app.services.openai_client import close_llm_client
+from app.services.image_ingest import close_image_client
+
+
+def _read_checkpoint(path: Path) -> int:
+    try:
+        return int(json.loads(path.read_text(encoding="utf-8"))["done"])
+    except FileNotFoundError:
+        return 0
+
+def _write_checkpoint(path: Path, done: int) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"done": done}), encoding="utf-8")
+    tmp.replace(path)
+
+def _truncate_lines(path: Path, keep: int) -> None:
+    # drop output written after the last checkpoint (crash between the two)
+    if not path.exists():
+        return
+    with open(path, "rb+") as f:
+        for _ in range(keep):
+            if not f.readline():
+                break
+        f.truncate()
+
+async def run(input_path: Path, output_path: Path, concurrency: int, retries: int) -> int:
+    checkpoint = output_path.with_name(output_path.name + ".checkpoint")
+    done = _read_checkpoint(checkpoint)
+    _truncate_lines(output_path, done)
+    if done:
+        print(f"Resuming after {done} records", file=sys.stderr)
+
+    failed = 0
+    try:
+        with open(input_path, encoding="utf-8") as src, open(output_path, "a", encoding="utf-8") as out:
+            records = suggest_tags_bulk(iter_file_lines(src), start=done,
+                                        concurrency=concurrency, retries=retries)
+            async for record in records:
+                out.write(jsonl(record))
+                out.flush()
+                done = record["index"] + 1
+                _write_checkpoint(checkpoint, done)
+                if "error" in record:
+                    failed += 1
+                    print(f"#{record['index']}: {record['error']}", file=sys.stderr)
+    finally:
+        await close_llm_client()
+        await close_image_client()
+
+    print(f"Done: {done} records ({failed} failed in this run)", file=sys.stderr)
+    return 1 if failed else 0
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Suggest tags for a JSONL file of artworks.")
+    parser.add_argument("input", type=Path)
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--concurrency", type=int, default=0, help="records in flight (default: TAG_BULK_CONCURRENCY)")
+    parser.add_argument("--retries", type=int, default=-1, help="retries per record (default: TAG_BULK_RETRIES)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.input, args.output, args.concurrency, args.retries)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+# ---- Response cache (app/services/cache.py) ----
+CACHE_MEMORY_MAX_ENTRIES = _env_int("CACHE_MEMORY_MAX_ENTRIES", 1024)
+CACHE_MEMORY_TTL_SECONDS = _env_int("CACHE_MEMORY_TTL_SECONDS", 60 * 30)
+CACHE_DISK_MAX_ENTRIES = _env_int("CACHE_DISK_MAX_ENTRIES", 20_000)
+CACHE_DISK_MAX_BYTES = _env_int("CACHE_DISK_MAX_BYTES", 256 * 1024 * 1024)
+# Entries older than this are removed by the background sweeper
+CACHE_MAX_AGE_SECONDS = _env_int("CACHE_MAX_AGE_SECONDS", 60 * 60 * 24)
+CACHE_SWEEP_INTERVAL_SECONDS = _env_int("CACHE_SWEEP_INTERVAL_SECONDS", 60 * 5)
+
+# "sqlite" (single indexed file) or "json" (one file per key)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite").lower()
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", "app/cache/cache.sqlite3")
+# Writes are buffered and committed in one transaction per batch
+CACHE_WRITE_BATCH_SIZE = _env_int("CACHE_WRITE_BATCH_SIZE", 64)
+CACHE_FLUSH_INTERVAL_SECONDS = _env_int("CACHE_FLUSH_INTERVAL_SECONDS", 1)
+
+# ---- Server catalog (/catalog/artworks) ----
+# SQLite file shared by all workers; "" keeps the catalog in memory (one process only)
+CATALOG_SQLITE_PATH = os.getenv("CATALOG_SQLITE_PATH", "app/cache/catalog.sqlite3")
+
+# ---- LLM provider (app/services/openai_client.py) ----
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.featherless.ai/v1")
+LLM_MODEL = os.getenv("LLM_MODEL", "Qwen/Qwen3-0.6B")
+# Shared connection pool for every LLM call in the process
+LLM_MAX_CONNECTIONS = _env_int("LLM_MAX_CONNECTIONS", 200)
+LLM_MAX_KEEPALIVE_CONNECTIONS = _env_int("LLM_MAX_KEEPALIVE_CONNECTIONS", 50)
+LLM_KEEPALIVE_EXPIRY_SECONDS = _env_float("LLM_KEEPALIVE_EXPIRY_SECONDS", 60.0)
+
+# ---- /ai/explain-batch ----
+EXPLAIN_BATCH_CONCURRENCY = _env_int("EXPLAIN_BATCH_CONCURRENCY", 4)
+EXPLAIN_BATCH_MAX_CONCURRENCY = _env_int("EXPLAIN_BATCH_MAX_CONCURRENCY", 16)
+
+# ---- Latency budgets (seconds) before answering with the deterministic result ----
+# Overridable per request with options.budget_seconds (0 disables the budget)
+BUYER_SESSION_BUDGET_SECONDS = _env_float("BUYER_SESSION_BUDGET_SECONDS", 8.0)
+RECOMMEND_BUDGET_SECONDS = _env_float("RECOMMEND_BUDGET_SECONDS", 8.0)
+
+# ---- LLM resilience: timeouts, retries, circuit breaker ----
+LLM_CONNECT_TIMEOUT_SECONDS = _env_float("LLM_CONNECT_TIMEOUT_SECONDS", 5.0)
+LLM_READ_TIMEOUT_SECONDS = _env_float("LLM_READ_TIMEOUT_SECONDS", 30.0)
+LLM_MAX_ATTEMPTS = _env_int("LLM_MAX_ATTEMPTS", 3)
+LLM_RETRY_BASE_DELAY_SECONDS = _env_float("LLM_RETRY_BASE_DELAY_SECONDS", 0.25)
+LLM_RETRY_MAX_DELAY_SECONDS = _env_float("LLM_RETRY_MAX_DELAY_SECONDS", 4.0)
+# Consecutive transient failures before calls short-circuit to the fallbacks
+LLM_BREAKER_FAILURE_THRESHOLD = _env_int("LLM_BREAKER_FAILURE_THRESHOLD", 5)
+# How long the breaker stays open before letting one probe call through
+LLM_BREAKER_RESET_SECONDS = _env_float("LLM_BREAKER_RESET_SECONDS", 30.0)
+
+# ---- Prompt token budgets (estimated tokens, see app/services/prompt_builder.py) ----
+# Candidate table in ai_curate_top_4; stories are trimmed to fit
+CURATION_TABLE_TOKEN_BUDGET = _env_int("CURATION_TABLE_TOKEN_BUDGET", 1200)
+# Story text per artwork in explain / compare prompts
+STORY_TOKEN_BUDGET = _env_int("STORY_TOKEN_BUDGET", 250)
+
+# ---- Background TTS jobs (buyer-session pre_tts) ----
+TTS_JOB_CONCURRENCY = _env_int("TTS_JOB_CONCURRENCY", 2)
+# Finished / failed jobs stay queryable this long
+TTS_JOB_RETENTION_SECONDS = _env_int("TTS_JOB_RETENTION_SECONDS", 60 * 60)
+
+# ---- TTS synthesis ----
+# Stories are synthesized sentence by sentence; longer sentences are split here
+TTS_SEGMENT_MAX_CHARS = _env_int("TTS_SEGMENT_MAX_CHARS", 300)
+TTS_SEGMENT_CONCURRENCY = _env_int("TTS_SEGMENT_CONCURRENCY", 4)
+# Disk quota for app/static/tts (stories + segments); least recently used files go first
+TTS_STORE_MAX_BYTES = _env_int("TTS_STORE_MAX_BYTES", 500 * 1024 * 1024)
+# Kept out of the response-cache directory itself (its json backend owns every *.json there)
+TTS_STORE_INDEX_PATH = os.getenv("TTS_STORE_INDEX_PATH", "app/cache/tts/index.json")
+# Access times are written back to the index about this often (new files sooner, and at exit)
+TTS_STORE_INDEX_FLUSH_SECONDS = _env_float("TTS_STORE_INDEX_FLUSH_SECONDS", 30.0)
+
+# ---- Image ingestion for tag suggestion ----
+IMAGE_MAX_BYTES = _env_int("IMAGE_MAX_BYTES", 8_000_000)
+IMAGE_MAX_PIXELS = _env_int("IMAGE_MAX_PIXELS", 50_000_000)
+IMAGE_FETCH_TIMEOUT_SECONDS = _env_float("IMAGE_FETCH_TIMEOUT_SECONDS", 10.0)
+IMAGE_FETCH_MAX_CONNECTIONS = _env_int("IMAGE_FETCH_MAX_CONNECTIONS", 20)
+# imageUrl downloads: "0" turns them off (imageBase64 still works). Only
+# public addresses are ever fetched; redirects are re-checked per hop.
+IMAGE_FETCH_ENABLED = os.getenv("IMAGE_FETCH_ENABLED", "1") != "0"
+IMAGE_FETCH_MAX_REDIRECTS = _env_int("IMAGE_FETCH_MAX_REDIRECTS", 3)
+# Images are downscaled to at most this many pixels per side before hashing
+IMAGE_THUMBNAIL_SIZE = _env_int("IMAGE_THUMBNAIL_SIZE", 64)
+# Perceptual-hash bits (of 64) two images may differ by and share tags
+IMAGE_HASH_MAX_DISTANCE = _env_int("IMAGE_HASH_MAX_DISTANCE", 6)
+
+# ---- Bulk tag suggestion (/ai/suggest-tags/bulk, python -m app.cli.suggest_tags_bulk) ----
+TAG_BULK_CONCURRENCY = _env_int("TAG_BULK_CONCURRENCY", 8)
+TAG_BULK_MAX_CONCURRENCY = _env_int("TAG_BULK_MAX_CONCURRENCY", 32)
+# Extra attempts per record after an unparseable answer or an open circuit
+# (provider errors are already retried by the LLM client, LLM_MAX_ATTEMPTS)
+TAG_BULK_RETRIES = _env_int("TAG_BULK_RETRIES", 2)
+
+# ---- Local tag classifier (runs before the LLM in tag suggestion) ----
+# Results at or above this confidence skip the LLM; 1.1 disables the shortcut
+TAG_CLASSIFIER_CONFIDENCE_THRESHOLD = _env_float("TAG_CLASSIFIER_CONFIDENCE_THRESHOLD", 0.75)
+# Each of these categories needs a confident tag before the LLM is skipped
+TAG_CLASSIFIER_REQUIRED_CATEGORIES = [
+    c.strip() for c in os.getenv("TAG_CLASSIFIER_REQUIRED_CATEGORIES", "style,mood,colors,themes").split(",") if c.strip()
+]
+# Accepted tags (POST /ai/suggest-tags/accept) the linear model trains on
+TAG_CLASSIFIER_EXAMPLES_PATH = os.getenv("TAG_CLASSIFIER_EXAMPLES_PATH", "app/cache/accepted_tags.jsonl")
+TAG_CLASSIFIER_MIN_EXAMPLES = _env_int("TAG_CLASSIFIER_MIN_EXAMPLES", 5)
+TAG_CLASSIFIER_RETRAIN_EVERY = _env_int("TAG_CLASSIFIER_RETRAIN_EVERY", 20)
+# Only the most recent accepted examples are kept and trained on
+TAG_CLASSIFIER_MAX_EXAMPLES = _env_int("TAG_CLASSIFIER_MAX_EXAMPLES", 1000)
+# Hashed feature space of the linear model (words share buckets beyond this)
+TAG_CLASSIFIER_FEATURES = _env_int("TAG_CLASSIFIER_FEATURES", 4096)
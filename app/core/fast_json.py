@@ -0,0 +1,75 @@
+from typing import Any, Callable, Dict
+
+import orjson
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from starlette.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    Default response class of the app: orjson instead of stdlib json.
+    (FastAPI's own ORJSONResponse is deprecated; this is the same render.)
+    """
+
+    def render(self, content: Any) -> bytes:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            # orjson refuses ints outside 64 bits; stdlib json writes them
+            return super().render(content)
+
+
+def json_body(shape: Any = Dict[str, Any]) -> Callable:
+    """
+    Route dependency replacing `payload: dict`:
+      payload: RecommendRequest = Depends(json_body(RecommendRequest))
+    The raw body is parsed once with orjson and validated into `shape`
+    (a model, TypedDict or any type pydantic accepts) in one TypeAdapter
+    pass, so routes get typed values instead of re-validating dicts.
+    - invalid JSON -> 400
+    - valid JSON of the wrong shape -> 422 (same format as FastAPI's)
+    """
+    adapter = TypeAdapter(shape)
+
+    async def dependency(request: Request) -> Any:
+        try:
+            data = orjson.loads(await request.body())
+        except orjson.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+        try:
+            return adapter.validate_python(data)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+            )
+
+    return dependency
+
+
+def _inline_refs(node: Any, defs: Dict[str, Any]) -> Any:
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref.startswith("#/$defs/"):
+            return _inline_refs(defs[ref[len("#/$defs/"):]], defs)
+        return {k: _inline_refs(v, defs) for k, v in node.items() if k != "$defs"}
+    if isinstance(node, list):
+        return [_inline_refs(v, defs) for v in node]
+    return node
+
+
+def json_body_openapi(shape: Any = Dict[str, Any]) -> Dict[str, Any]:
+    """
+    openapi_extra for routes taking Depends(json_body(shape)), so /docs
+    still shows the request body a typed parameter would have declared:
+      @router.post("/ai/recommend", openapi_extra=json_body_openapi(RecommendRequest))
+    Nested models are inlined (the request shapes here are not recursive).
+    """
+    schema = TypeAdapter(shape).json_schema()
+    return {
+        "requestBody": {
+            "content": {"application/json": {"schema": _inline_refs(schema, schema.get("$defs", {}))}},
+            "required": True,
+        }
+    }
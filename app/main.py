@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
@@ -7,10 +9,22 @@ from app.routes.compare import router as compare_router
 from app.routes.tts import router as tts_router
 from app.routes.suggest_tags import router as suggest_tags_router
 from app.routes.buyer_session import router as buyer_session_router  # NEW
+from app.routes.catalog import router as catalog_router
+from app.routes.cache_stats import router as cache_stats_router
+from app.routes.audio import audio_files
 
-app = FastAPI(title="MyArtWorld AI Service")
+from app.core.fast_json import ORJSONResponse
+from app.services.openai_client import close_llm_client
+from app.services.image_ingest import close_image_client
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # release pooled LLM / image-fetch connections
+    await close_llm_client()
+    await close_image_client()
+
+app = FastAPI(title="MyArtWorld AI Service", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.include_router(recommend_router)
 app.include_router(explain_router)
@@ -18,3 +32,9 @@ app.include_router(compare_router)
 app.include_router(tts_router)
 app.include_router(suggest_tags_router)
 app.include_router(buyer_session_router)  # NEW
+app.include_router(catalog_router)
+app.include_router(cache_stats_router)
+
+# Mounts go last so API routes win; /static/tts must precede /static
+app.mount("/static/tts", audio_files, name="tts_audio")
+app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -17,3 +17,8 @@ class CompareOutput(BaseModel):
     why: str
     differences: List[CompareDifference]
     confidence_tip: str
+
+class CurationOutput(BaseModel):
+    curator_welcome: str
+    top_artwork_ids: List[str]
+    reasons: Dict[str, List[str]]
@@ -1,5 +1,8 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, field_validator
+from typing import Any, Dict, List, Optional
+from typing_extensions import TypedDict
+
+from app.models.taxonomy import taxonomy
 
 class Size(BaseModel):
     width: float
@@ -18,3 +21,57 @@ class Artwork(BaseModel):
     story: str
     imageUrl: str
     audioStoryUrl: str
+
+    @field_validator("tags")
+    @classmethod
+    def _normalize_tags(cls, tags: List[str]) -> List[str]:
+        # "Blue" / "blue", "Minimalist" / "minimal" match the same profile tag
+        return taxonomy.normalize_list(tags)
+
+    @property
+    def area(self) -> float:
+        return self.size.width * self.size.height
+
+# ---- Compact records for request-supplied artwork lists ----
+# Same fields and coercion rules as Artwork/Size, validated as plain dicts
+# together with the request body (see request_models.RecommendRequest)
+class SizeFields(TypedDict):
+    width: float
+    height: float
+    unit: str
+
+class ArtworkFields(TypedDict):
+    id: str
+    title: str
+    artistName: str
+    year: int
+    price: float
+    currency: str
+    size: SizeFields
+    tags: List[str]
+    story: str
+    imageUrl: str
+    audioStoryUrl: str
+
+class ArtworkRecord:
+    """
+    What ranking reads (id, normalized tags, price, area) as plain slots,
+    plus the validated fields. The full Artwork model is only built by
+    artwork(), i.e. for the shortlist that reaches the LLM.
+    """
+    __slots__ = ("id", "tags", "price", "area", "fields", "_artwork")
+
+    def __init__(self, fields: Dict[str, Any]):
+        self.id: str = fields["id"]
+        self.tags: List[str] = taxonomy.normalize_list(fields["tags"])
+        self.price: float = fields["price"]
+        self.area: float = fields["size"]["width"] * fields["size"]["height"]
+        self.fields = fields
+        self._artwork: Optional[Artwork] = None
+
+    def artwork(self) -> Artwork:
+        if self._artwork is None:
+            # already validated: skip a second validation pass
+            values = dict(self.fields, tags=self.tags, size=Size.model_construct(**self.fields["size"]))
+            self._artwork = Artwork.model_construct(**values)
+        return self._artwork
@@ -0,0 +1,20 @@
+from typing import Any, Dict, List, Optional
+from typing_extensions import NotRequired, TypedDict
+
+from app.models.artwork import Artwork, ArtworkFields
+from app.models.user_profile import UserProfile
+
+# Request bodies parsed by app.core.fast_json.json_body (plain dicts with
+# typed values, so routes keep their payload["..."] access)
+
+class RecommendRequest(TypedDict):
+    """
+    /ai/recommend and /ai/buyer-session. Without "artworks" the server
+    catalog is ranked; artworks stay validated dicts (see ArtworkRecord).
+    """
+    userProfile: UserProfile
+    artworks: NotRequired[Optional[List[ArtworkFields]]]
+    options: NotRequired[Optional[Dict[str, Any]]]
+
+class CatalogUpsertRequest(TypedDict):
+    artworks: NotRequired[List[Artwork]]
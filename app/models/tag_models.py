@@ -25,3 +25,11 @@ class TagSuggestResponse(BaseModel):
     themes: List[str]
     space: List[str]
     explanation: str
+
+class TagAcceptRequest(TagSuggestRequest):
+    # Final tags the artist kept; used to train the local classifier
+    style: List[str] = []
+    mood: List[str] = []
+    colors: List[str] = []
+    themes: List[str] = []
+    space: List[str] = []
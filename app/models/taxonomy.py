@@ -0,0 +1,147 @@
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Optional
+
+from app.models.tag_models import STYLE_TAGS, MOOD_TAGS, COLOR_TAGS, THEME_TAGS, SPACE_TAGS
+
+CATEGORIES: Dict[str, List[str]] = {
+    "style": STYLE_TAGS,
+    "mood": MOOD_TAGS,
+    "colors": COLOR_TAGS,
+    "themes": THEME_TAGS,
+    "space": SPACE_TAGS,
+}
+
+# Other spellings that mean exactly the tag (not loose associations: those
+# live in the tag classifier's lexicon)
+ALIASES: Dict[str, List[str]] = {
+    "realistic": ["realism", "realist", "photorealistic"],
+    "minimal": ["minimalist", "minimalism"],
+    "surreal": ["surrealism", "surrealist"],
+    "expressionist": ["expressionism", "expressionistic"],
+    "impressionist": ["impressionism", "impressionistic"],
+    "pop-art": ["popart"],
+    "geometric": ["geometry", "geometrical"],
+    "energetic": ["energy"],
+    "melancholic": ["melancholy"],
+    "joyful": ["joy", "joyous"],
+    "mysterious": ["mystery"],
+    "reflective": ["reflection"],
+    "monochrome": ["monochromatic", "black and white", "black & white", "b&w"],
+    "pastel": ["pastels"],
+    "memory": ["memories"],
+    "dream": ["dreams"],
+    "portrait": ["portraits"],
+    "landscape": ["landscapes"],
+    "living_room": ["livingroom", "lounge"],
+    "hallway": ["hall", "corridor"],
+}
+
+_SEPARATORS = re.compile(r"[\s_\-]+")
+
+# Other raw spellings resolved through tag_key() are memoized up to this many
+RESOLVE_CACHE_SIZE = 8192
+
+
+def tag_key(raw: str) -> str:
+    """
+    Lookup form of a tag: lowercase, with runs of spaces / "_" / "-" as one space.
+    """
+    return _SEPARATORS.sub(" ", (raw or "").strip().lower()).strip()
+
+
+class TaxonomyRegistry:
+    """
+    Built once from tag_models and never grows. Every taxonomy tag (and
+    alias) maps to a compact integer id 0..N-1, in category order.
+    - normalize(): canonical spelling ("Living Room" -> "living_room",
+      "Minimalist" -> "minimal"); free-form tags keep their own spelling
+    - lookup() / ids() / mask(): integer forms for O(1) membership
+    - match_key() / keys(): the id, or for free-form tags outside the
+      taxonomy their tag_key() string, so those still match each other
+      without request data growing process-wide state
+    """
+
+    def __init__(self, categories: Dict[str, List[str]], aliases: Dict[str, List[str]]):
+        self._names: List[str] = []
+        self._by_key: Dict[str, int] = {}
+        # exact spellings -> id, checked before tag_key() (tags normalized at
+        # ingestion are canonical, so scoring never reaches the regex)
+        self._by_spelling: Dict[str, int] = {}
+        self.category_ids: Dict[str, FrozenSet[int]] = {}
+
+        for category, tags in categories.items():
+            ids = []
+            for tag in tags:
+                tid = self._by_key.setdefault(tag_key(tag), len(self._names))
+                if tid == len(self._names):
+                    self._names.append(tag)
+                ids.append(tid)
+            self.category_ids[category] = frozenset(ids)
+
+        for tag, spellings in aliases.items():
+            tid = self._by_key[tag_key(tag)]
+            for spelling in spellings:
+                self._by_key.setdefault(tag_key(spelling), tid)
+
+        for tid, name in enumerate(self._names):
+            self._by_spelling[name] = tid
+        for key, tid in self._by_key.items():
+            self._by_spelling.setdefault(key, tid)
+        self._resolve = lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve_key)
+
+    def _resolve_key(self, raw: str) -> Hashable:
+        key = tag_key(raw)
+        tid = self._by_key.get(key)
+        return key if tid is None else tid
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def lookup(self, raw: str) -> Optional[int]:
+        """
+        Id of a taxonomy tag or alias (None for free-form tags).
+        """
+        key = self.match_key(raw)
+        return key if isinstance(key, int) else None
+
+    def match_key(self, raw: str) -> Hashable:
+        tid = self._by_spelling.get(raw)
+        return tid if tid is not None else self._resolve(raw)
+
+    def name(self, tid: int) -> str:
+        return self._names[tid]
+
+    def normalize(self, raw: str) -> str:
+        # only the matching key of a free-form tag is normalized ("sci-fi"
+        # stays "sci-fi" for display, and still matches "Sci Fi")
+        tid = self.lookup(raw)
+        return raw if tid is None else self._names[tid]
+
+    def normalize_list(self, tags: Iterable[str]) -> List[str]:
+        # order and duplicates are kept: scoring counts repeated tags
+        return [self.normalize(t) for t in tags]
+
+    def ids(self, tags: Iterable[str]) -> FrozenSet[int]:
+        return frozenset(tid for tid in (self.lookup(t) for t in tags) if tid is not None)
+
+    def keys(self, tags: Iterable[str]) -> FrozenSet[Hashable]:
+        return frozenset(self.match_key(t) for t in tags)
+
+    def mask(self, tags: Iterable[str]) -> int:
+        bits = 0
+        for tid in self.ids(tags):
+            bits |= 1 << tid
+        return bits
+
+    def in_category(self, raw: str, category: str) -> Optional[str]:
+        """
+        Canonical tag if `raw` names a tag of `category`, else None.
+        """
+        tid = self.lookup(raw)
+        if tid is not None and tid in self.category_ids.get(category, ()):
+            return self._names[tid]
+        return None
+
+
+taxonomy = TaxonomyRegistry(CATEGORIES, ALIASES)
@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import List
 
+from app.models.taxonomy import taxonomy
+
 class Budget(BaseModel):
     min: float
     max: float
@@ -12,3 +14,14 @@ class UserProfile(BaseModel):
     themes: List[str]
     budget: Budget
     space: str  # bedroom | living_room | study
+
+    @field_validator("style", "mood", "colors", "themes")
+    @classmethod
+    def _normalize_tags(cls, tags: List[str]) -> List[str]:
+        return taxonomy.normalize_list(tags)
+
+    @field_validator("space")
+    @classmethod
+    def _normalize_space(cls, space: str) -> str:
+        # "Living Room" -> "living_room"
+        return taxonomy.normalize(space)
@@ -0,0 +1,53 @@
+import os
+import re
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.services.tts_service import CACHE_DIR, audio_store
+
+# Content-addressed names: the hash covers text, voice, model and speed
+_HASHED_NAME = re.compile(r"(?:segments/)?([0-9a-f]{64})\.mp3")
+
+# Hashed files never change, so clients and CDNs may keep them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class AudioFiles(StaticFiles):
+    """
+    Serves app/static/tts (mounted at /static/tts, ahead of /static).
+    For content-addressed files it adds
+    - Cache-Control: immutable with a one-year max-age
+    - a strong ETag that is the file's hash, so it is stable across
+      servers and re-syncs (If-None-Match -> 304, If-Range works)
+    Range / 206 responses and HEAD come from starlette's FileResponse.
+    Hits also count as accesses for the store's LRU eviction.
+    """
+
+    def file_response(self, full_path: "os.PathLike", stat_result: os.stat_result,
+                      scope: Scope, status_code: int = 200) -> Response:
+        name = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        match = _HASHED_NAME.fullmatch(name)
+        if match is None:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        audio_store.has(name)  # touch for LRU
+        headers = {
+            "cache-control": IMMUTABLE_CACHE_CONTROL,
+            "etag": f'"{match.group(1)}"',
+        }
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            media_type="audio/mpeg",
+            headers=headers,
+        )
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+audio_files = AudioFiles(directory=str(CACHE_DIR))
@@ -1,116 +1,220 @@
-from fastapi import APIRouter
+import copy
+from fastapi import APIRouter, Depends
+from starlette.concurrency import run_in_threadpool
 from typing import Dict, Any, List
 
+from app.core.fast_json import json_body, json_body_openapi
 from app.models.user_profile import UserProfile
-from app.models.artwork import Artwork
+from app.models.artwork import Artwork, ArtworkRecord
+from app.models.request_models import RecommendRequest
 
-from app.services.recommendation import rank_artworks
-from app.services.ai_curation import ai_curate_top_4
+from app.services.recommendation import rank_top_k
+from app.services.catalog import catalog
+from app.services.ai_curation import ai_curate_top_4, stream_curate_top_4
 from app.services.cache import make_cache_key, cache_get, cache_set
+from app.services.fingerprints import record_fingerprint, profile_fingerprint
+from app.services.llm_stream import sse_event, sse_response
+from app.services.json_stream import RESET
+from app.services.deadline import resolve_budget, run_with_budget
+from app.core import config
 
-# Optional: if you want to pre-generate audio for curator welcome
-from app.services.tts_service import synthesize_story_to_mp3
+# Optional: pre-generate audio for curator welcome in the background
+from app.services.tts_jobs import submit_tts_job
 
 router = APIRouter()
 
-@router.post("/ai/buyer-session")
-def buyer_session(payload: Dict[str, Any]):
-    """
-    Input:
-      {
-        "userProfile": {...},
-        "artworks": [...],
-        "options": { "use_ai": true, "pre_tts": false }
-      }
+SESSION_TTL_SECONDS = 60 * 60 * 6  # 6 hours
 
-    Output:
-      {
-        "sessionKey": "...",
-        "recommendedArtworks": ["id1","id2","id3","id4"],
-        "curator_welcome": "...",
-        "reasons": { "id1": ["..."] },
-        "audio": { "curator_welcome_url": "/static/tts/..." }   # optional
-      }
-    """
+def _session_context(payload: RecommendRequest) -> Dict[str, Any]:
     options = payload.get("options", {}) or {}
     use_ai = bool(options.get("use_ai", True))
     pre_tts = bool(options.get("pre_tts", False))
 
-    user = UserProfile(**payload["userProfile"])
-    artworks = [Artwork(**a) for a in payload["artworks"]]
+    user = payload["userProfile"]
 
     # ---- Cache key should depend on user profile + artworks "fingerprint" ----
-    # To keep hash stable but not huge, we only include essential art fields.
-    art_fingerprint = [{
-        "id": a.id,
-        "price": a.price,
-        "currency": a.currency,
-        "year": a.year,
-        "size": {"w": a.size.width, "h": a.size.height, "u": a.size.unit},
-        "tags": sorted(a.tags),
-        # story affects curator reasoning; include a small prefix to avoid huge keys
-        "story": (a.story or "")[:120]
-    } for a in artworks]
+    if payload.get("artworks") is None:
+        # Server catalog: its revision changes whenever the catalog does
+        artworks = None
+        art_fingerprint = {"catalogRevision": catalog.revision}
+    else:
+        # Compact records: the full Artwork is only built for the shortlist
+        artworks = [ArtworkRecord(fields) for fields in payload["artworks"]]
+        # To keep hash stable but not huge, we only include essential art fields.
+        art_fingerprint = [record_fingerprint(a) for a in artworks]
 
     cache_payload = {
-        "userProfile": user.model_dump(),
+        "userProfile": profile_fingerprint(user),
         "artFingerprint": art_fingerprint,
         "use_ai": use_ai,
         "pre_tts": pre_tts
     }
-    key = make_cache_key("buyer_session", cache_payload)
-
-    cached = cache_get(key, ttl_seconds=60 * 60 * 6)  # 6 hours
-    if cached:
-        cached["sessionKey"] = key
-        return cached
+    return {
+        "user": user,
+        "artworks": artworks,
+        "use_ai": use_ai,
+        "pre_tts": pre_tts,
+        "budget": resolve_budget(options, config.BUYER_SESSION_BUDGET_SECONDS),
+        "key": make_cache_key("buyer_session", cache_payload),
+    }
 
+async def _shortlist(user: UserProfile, artworks) -> List[Artwork]:
     # ---- Retrieval layer (deterministic shortlist) ----
-    ranked = rank_artworks(artworks, user)
-    candidates = [item["artwork"] for item in ranked[:20]]
-
+    if artworks is None:
+        ranked = await run_in_threadpool(catalog.rank, user, 20)
+    else:
+        ranked = await run_in_threadpool(rank_top_k, artworks, user, 20)
+        return [item["artwork"].artwork() for item in ranked]
+    return [item["artwork"] for item in ranked]
+
+def _fallback_result(candidates: List[Artwork]) -> Dict[str, Any]:
     # fallback deterministic top 4 ids
     fallback_ids = [c.id for c in candidates[:4]]
-
-    result = {
+    return {
         "recommendedArtworks": fallback_ids,
         "curator_welcome": "Here are artworks selected based on your preferences.",
         "reasons": {aid: ["Matches your preferences."] for aid in fallback_ids},
         "audio": {}
     }
 
-    # ---- AI curation layer ----
-    if use_ai and candidates:
-        try:
-            ai = ai_curate_top_4(user, candidates)
+def _valid_top_ids(top_ids, candidates: List[Artwork], fallback_ids: List[str]) -> List[str]:
+    # Ensure ids are valid and exist in candidates
+    candidate_ids = {c.id for c in candidates}
+    top_ids = [i for i in (top_ids or []) if i in candidate_ids]
+    return top_ids or fallback_ids
 
-            top_ids = ai.get("top_artwork_ids") or []
-            # Ensure ids are valid and exist in candidates
-            candidate_ids = {c.id for c in candidates}
-            top_ids = [i for i in top_ids if i in candidate_ids]
-
-            if len(top_ids) == 0:
-                top_ids = fallback_ids
-
-            result["recommendedArtworks"] = top_ids
-            result["curator_welcome"] = ai.get("curator_welcome") or result["curator_welcome"]
-            result["reasons"] = ai.get("reasons") or result["reasons"]
-
-        except Exception:
-            # keep fallback
-            pass
+def _merge_ai(result: Dict[str, Any], ai: Dict[str, Any], candidates: List[Artwork]) -> None:
+    result["recommendedArtworks"] = _valid_top_ids(
+        ai.get("top_artwork_ids"), candidates, result["recommendedArtworks"]
+    )
+    result["curator_welcome"] = ai.get("curator_welcome") or result["curator_welcome"]
+    result["reasons"] = ai.get("reasons") or result["reasons"]
 
+def _attach_audio(result: Dict[str, Any], pre_tts: bool) -> Dict[str, Any]:
     # ---- Optional: pre-generate TTS for curator welcome (demo wow) ----
+    # Queued in the background; the response carries a pending handle
+    # (deduped per text, so cache hits just pick up the finished job)
     if pre_tts:
         try:
-            rel = synthesize_story_to_mp3(result["curator_welcome"], voice="alloy", speed=1.0)
-            result["audio"]["curator_welcome_url"] = f"/static/{rel}"
+            job = submit_tts_job(result["curator_welcome"], voice="alloy", speed=1.0)
+            result["audio"] = {"curator_welcome_url": job["audioUrl"], "curator_welcome_job": job}
         except Exception:
-            result["audio"]["curator_welcome_url"] = None
+            result["audio"] = {"curator_welcome_url": None}
+    return result
 
-    # Cache it
+def _finish(result: Dict[str, Any], key: str, pre_tts: bool) -> Dict[str, Any]:
+    # Cache it (job status is per response, not cached)
     cache_set(key, result)
 
     # Attach session key
     result["sessionKey"] = key
-    return result
+    return _attach_audio(result, pre_tts)
+
+@router.post("/ai/buyer-session", openapi_extra=json_body_openapi(RecommendRequest))
+async def buyer_session(payload: RecommendRequest = Depends(json_body(RecommendRequest))):
+    """
+    Input:
+      {
+        "userProfile": {...},
+        "artworks": [...],          # optional, defaults to the server catalog
+        "options": { "use_ai": true, "pre_tts": false, "budget_seconds": 8 }
+      }
+
+    If the AI curation does not finish within the latency budget, the
+    deterministic shortlist is returned; the curation keeps running in the
+    background and caches its result for the next call.
+
+    Output:
+      {
+        "sessionKey": "...",
+        "recommendedArtworks": ["id1","id2","id3","id4"],
+        "curator_welcome": "...",
+        "reasons": { "id1": ["..."] },
+        "audio": {                                               # pre_tts only
+          "curator_welcome_url": "/static/tts/<hash>.mp3",       # valid once the job is done
+          "curator_welcome_job": { "jobId", "status", "statusUrl", ... }
+        }
+      }
+
+    With pre_tts the response does not wait for synthesis: poll
+    GET /tts/jobs/{jobId} (optionally with ?wait_seconds=N).
+    """
+    ctx = _session_context(payload)
+    key = ctx["key"]
+
+    cached = cache_get(key, ttl_seconds=SESSION_TTL_SECONDS)
+    if cached:
+        cached["sessionKey"] = key
+        return _attach_audio(cached, ctx["pre_tts"])
+
+    candidates = await _shortlist(ctx["user"], ctx["artworks"])
+    result = _fallback_result(candidates)
+
+    if not (ctx["use_ai"] and candidates):
+        return _finish(result, key, ctx["pre_tts"])
+
+    finished, curated = await run_with_budget(
+        _curate(ctx, candidates, copy.deepcopy(result)), ctx["budget"]
+    )
+    if finished:
+        return curated
+
+    # Budget exhausted: answer deterministically, don't cache it
+    result["sessionKey"] = key
+    return _attach_audio(result, ctx["pre_tts"])
+
+async def _curate(ctx: Dict[str, Any], candidates: List[Artwork], result: Dict[str, Any]) -> Dict[str, Any]:
+    # ---- AI curation layer ----
+    try:
+        ai = await ai_curate_top_4(ctx["user"], candidates)
+        _merge_ai(result, ai, candidates)
+    except Exception:
+        # keep fallback
+        pass
+
+    return _finish(result, ctx["key"], ctx["pre_tts"])
+
+@router.post("/ai/buyer-session/stream", openapi_extra=json_body_openapi(RecommendRequest))
+async def buyer_session_stream(payload: RecommendRequest = Depends(json_body(RecommendRequest))):
+    """
+    Same input as /ai/buyer-session, answered as Server-Sent Events:
+      event: curator_welcome       as soon as the model has written it
+      event: recommendedArtworks   validated ids
+      event: reasons
+      event: reset                 discard the events above received so far
+      event: result                the full /ai/buyer-session object (always last)
+    Cache hits and fallbacks only send `result`.
+    """
+    ctx = _session_context(payload)
+    return sse_response(_session_events(ctx))
+
+async def _session_events(ctx: Dict[str, Any]):
+    key = ctx["key"]
+    cached = cache_get(key, ttl_seconds=SESSION_TTL_SECONDS)
+    if cached:
+        cached["sessionKey"] = key
+        yield sse_event("result", _attach_audio(cached, ctx["pre_tts"]))
+        return
+
+    candidates = await _shortlist(ctx["user"], ctx["artworks"])
+    result = _fallback_result(candidates)
+
+    if ctx["use_ai"] and candidates:
+        try:
+            async for field, value in stream_curate_top_4(ctx["user"], candidates):
+                if field is None:
+                    _merge_ai(result, value, candidates)
+                elif field == "curator_welcome" and value:
+                    yield sse_event("curator_welcome", value)
+                elif field == "top_artwork_ids":
+                    ids = _valid_top_ids(value, candidates, result["recommendedArtworks"])
+                    yield sse_event("recommendedArtworks", ids)
+                elif field == "reasons" and value:
+                    yield sse_event("reasons", value)
+                elif field is RESET:
+                    yield sse_event("reset", None)
+        except Exception as e:
+            # keep fallback
+            print(f"AI Error in /ai/buyer-session/stream: {e}")
+
+    yield sse_event("result", _finish(result, key, ctx["pre_tts"]))
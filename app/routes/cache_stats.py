@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+
+from app.services.cache import cache_stats
+
+router = APIRouter()
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    """
+    Hit rates, evictions and tier sizes of the response cache.
+    """
+    return cache_stats()
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.core.fast_json import json_body, json_body_openapi
+from app.models.request_models import CatalogUpsertRequest
+from app.services.catalog import catalog
+
+router = APIRouter()
+
+@router.post("/catalog/artworks", openapi_extra=json_body_openapi(CatalogUpsertRequest))
+def upsert_artworks(payload: CatalogUpsertRequest = Depends(json_body(CatalogUpsertRequest))):
+    """
+    Input:  { "artworks": [...] }   (new ids are added, existing ids replaced)
+    Output: { "upserted": 3, "total": 120, "revision": "..." }
+    """
+    artworks = payload.get("artworks", [])
+    try:
+        count = catalog.upsert(artworks)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"upserted": count, "total": len(catalog), "revision": catalog.revision}
+
+@router.delete("/catalog/artworks/{artwork_id}")
+def delete_artwork(artwork_id: str):
+    deleted = catalog.delete(artwork_id)
+    return {"deleted": deleted, "total": len(catalog), "revision": catalog.revision}
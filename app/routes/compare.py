@@ -1,17 +1,20 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from typing import Any, Dict
+
+from app.core.fast_json import json_body, json_body_openapi
 from app.models.artwork import Artwork
 from app.models.user_profile import UserProfile
 from app.services.ai_buddy import compare_artworks
 
 router = APIRouter()
 
-@router.post("/ai/compare")
-def compare(payload: dict):
+@router.post("/ai/compare", openapi_extra=json_body_openapi())
+async def compare(payload: Dict[str, Any] = Depends(json_body())):
     try:
         user = UserProfile(**payload["userProfile"])
         artA = Artwork(**payload["artA"])
         artB = Artwork(**payload["artB"])
-        result = compare_artworks(user, artA, artB)
+        result = await compare_artworks(user, artA, artB)
         return result
     except Exception as e:
         print(f"AI Error in /ai/compare: {e}")
@@ -1,24 +1,112 @@
-from fastapi import APIRouter
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, Dict
+
+from app.core import config
+from app.core.fast_json import json_body, json_body_openapi
 from app.models.artwork import Artwork
 from app.models.user_profile import UserProfile
-from app.services.ai_buddy import explain_artwork
+from app.models.ai_outputs import ExplainOutput
+from app.services.ai_buddy import explain_artwork, stream_explain_artwork
+from app.services.json_stream import RESET
+from app.services.llm_stream import sse_event, sse_response
 
 router = APIRouter()
 
-@router.post("/ai/explain")
-def explain(payload: dict):
+def _fallback_explain(artwork: Dict[str, Any]) -> Dict[str, Any]:
+    art_title = artwork.get("title", "Artwork")
+    return {
+        "summary": f"This is a beautiful piece titled {art_title}. (AI unavailable)",
+        "bullets": ["Matches your preferences", "Fits within budget", "Complementary style"],
+        "placement": "Perfect for your wall.",
+        "buyer_questions": ["Is framing included?", "What are the shipping costs?", "Is a certificate of authenticity provided?"]
+    }
+
+@router.post("/ai/explain", openapi_extra=json_body_openapi())
+async def explain(payload: Dict[str, Any] = Depends(json_body())):
     try:
         user = UserProfile(**payload["userProfile"])
         art = Artwork(**payload["artwork"])
-        result = explain_artwork(user, art)
+        result = await explain_artwork(user, art)
         return result
     except Exception as e:
         print(f"AI Error in /ai/explain: {e}")
         # Fallback response
-        art_title = payload["artwork"].get("title", "Artwork")
-        return {
-            "summary": f"This is a beautiful piece titled {art_title}. (AI unavailable)",
-            "bullets": ["Matches your preferences", "Fits within budget", "Complementary style"],
-            "placement": "Perfect for your wall.",
-            "buyer_questions": ["Is framing included?", "What are the shipping costs?", "Is a certificate of authenticity provided?"]
-        }
+        return _fallback_explain(payload["artwork"])
+
+@router.post("/ai/explain/stream", openapi_extra=json_body_openapi())
+async def explain_stream(payload: Dict[str, Any] = Depends(json_body())):
+    """
+    Same input as /ai/explain, answered as Server-Sent Events:
+      event: summary / bullets / placement / buyer_questions
+             (one per field, as soon as the model has written it)
+      event: reset    discard the field events received so far
+      event: result   the validated ExplainOutput, or the fallback (always last)
+    """
+    return sse_response(_explain_events(payload))
+
+async def _explain_events(payload: dict):
+    try:
+        user = UserProfile(**payload["userProfile"])
+        art = Artwork(**payload["artwork"])
+        async for field, value in stream_explain_artwork(user, art):
+            if field is None:
+                yield sse_event("result", value)
+                return
+            if field is RESET:
+                yield sse_event("reset", None)
+            elif field in ExplainOutput.model_fields:
+                yield sse_event(field, value)
+    except Exception as e:
+        print(f"AI Error in /ai/explain/stream: {e}")
+    yield sse_event("result", _fallback_explain(payload.get("artwork") or {}))
+
+def _batch_concurrency(options: Dict[str, Any]) -> int:
+    # like resolve_budget: a value that isn't a number falls back to the default
+    try:
+        limit = int(options.get("concurrency") or config.EXPLAIN_BATCH_CONCURRENCY)
+    except (TypeError, ValueError):
+        limit = config.EXPLAIN_BATCH_CONCURRENCY
+    return max(1, min(limit, config.EXPLAIN_BATCH_MAX_CONCURRENCY))
+
+@router.post("/ai/explain-batch", openapi_extra=json_body_openapi())
+async def explain_batch(payload: Dict[str, Any] = Depends(json_body())):
+    """
+    Input:
+      {
+        "userProfile": {...},
+        "artworks": [...],
+        "options": { "concurrency": 4 }   # optional
+      }
+
+    Output: { "<artwork id>": ExplainOutput, ... }
+    Each artwork is explained concurrently (bounded); a failing item gets the
+    same fallback as /ai/explain without affecting the others.
+    Results are keyed by id, so items that aren't objects and repeated ids
+    are rejected (400).
+    """
+    user = UserProfile(**payload["userProfile"])
+    options = payload.get("options") or {}
+    if not isinstance(options, dict):
+        options = {}
+    sem = asyncio.Semaphore(_batch_concurrency(options))
+
+    raw_artworks = payload.get("artworks", []) or []
+    if not isinstance(raw_artworks, list) or not all(isinstance(raw, dict) for raw in raw_artworks):
+        raise HTTPException(status_code=400, detail="artworks must be a list of objects")
+    ids = [raw.get("id") for raw in raw_artworks]
+    if len(set(map(str, ids))) != len(ids):
+        raise HTTPException(status_code=400, detail="artworks contain duplicate ids")
+
+    async def explain_one(raw: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            art = Artwork(**raw)
+            async with sem:
+                result = await explain_artwork(user, art)
+            return ExplainOutput.model_validate(result).model_dump()
+        except Exception as e:
+            print(f"AI Error in /ai/explain-batch ({raw.get('id')}): {e}")
+            return _fallback_explain(raw)
+
+    results = await asyncio.gather(*(explain_one(a) for a in raw_artworks))
+    return dict(zip(ids, results))
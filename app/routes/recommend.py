@@ -1,24 +1,67 @@
-from fastapi import APIRouter
-from app.models.artwork import Artwork
-from app.models.user_profile import UserProfile
-from app.services.recommendation import rank_artworks
+from fastapi import APIRouter, Depends
+from starlette.concurrency import run_in_threadpool
+from app.core import config
+from app.core.fast_json import json_body, json_body_openapi
+from app.models.artwork import ArtworkRecord
+from app.models.request_models import RecommendRequest
+from app.services.recommendation import rank_top_k
+from app.services.catalog import catalog
 from app.services.ai_curation import ai_curate_top_4
+from app.services.cache import make_cache_key, cache_get, cache_set
+from app.services.fingerprints import artwork_fingerprint, profile_fingerprint
+from app.services.deadline import resolve_budget, run_with_budget
 
 router = APIRouter()
 
-@router.post("/ai/recommend")
-def recommend(payload: dict):
-    user = UserProfile(**payload["userProfile"])
-    artworks = [Artwork(**a) for a in payload["artworks"]]
+RECOMMEND_TTL_SECONDS = 60 * 60 * 6  # 6 hours
 
-    ranked = rank_artworks(artworks, user)
-    candidates = [item["artwork"] for item in ranked[:20]]
+@router.post("/ai/recommend", openapi_extra=json_body_openapi(RecommendRequest))
+async def recommend(payload: RecommendRequest = Depends(json_body(RecommendRequest))):
+    """
+    Optional "options": { "budget_seconds": 8 }. If the AI curation misses the
+    budget, the deterministic top 4 is returned and the curation finishes in
+    the background, caching its result for the next identical request.
+    """
+    user = payload["userProfile"]
+    options = payload.get("options", {}) or {}
 
-    try:
-        ai_result = ai_curate_top_4(user, candidates)
+    # Without "artworks", rank the server-side catalog (see /catalog/artworks)
+    if payload.get("artworks") is None:
+        ranked = await run_in_threadpool(catalog.rank, user, 20)
+        candidates = [item["artwork"] for item in ranked]
+    else:
+        # Validated with the body; compact records for ranking, only the
+        # shortlist becomes full Artwork models
+        records = [ArtworkRecord(fields) for fields in payload["artworks"]]
+        ranked = await run_in_threadpool(rank_top_k, records, user, 20)
+        candidates = [item["artwork"].artwork() for item in ranked]
+
+    fallback = {
+        "recommendedArtworks": [a.id for a in candidates[:4]],
+        "curator_welcome": "Here are some artworks selected based on your preferences."
+    }
+    # Nothing to curate: the model would only invent ids
+    if not candidates:
+        return fallback
+
+    # The curation only sees the shortlist, so that is what the key covers
+    key = make_cache_key("recommend", {
+        "userProfile": profile_fingerprint(user),
+        "artFingerprint": [artwork_fingerprint(a) for a in candidates],
+    })
+    cached = cache_get(key, ttl_seconds=RECOMMEND_TTL_SECONDS)
+    if cached:
+        return cached
+
+    async def curate():
+        try:
+            ai_result = await ai_curate_top_4(user, candidates)
+        except Exception:
+            return fallback
+        if isinstance(ai_result, dict):
+            cache_set(key, ai_result)
         return ai_result
-    except Exception:
-        return {
-            "recommendedArtworks": [a.id for a in candidates[:4]],
-            "curator_welcome": "Here are some artworks selected based on your preferences."
-        }
+
+    budget = resolve_budget(options, config.RECOMMEND_BUDGET_SECONDS)
+    finished, result = await run_with_budget(curate(), budget)
+    return result if finished else fallback
@@ -1,9 +1,39 @@
-from fastapi import APIRouter
-from app.models.tag_models import TagSuggestRequest
-from app.services.tag_suggester import suggest_tags_from_image
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from app.models.tag_models import TagAcceptRequest, TagSuggestRequest
+from app.services.tag_suggester import accept_tags, suggest_tags_from_image
+from app.services.tag_bulk import iter_file_lines, jsonl, suggest_tags_bulk
+from app.services.llm_stream import STREAMING_HEADERS
 
 router = APIRouter()
 
 @router.post("/ai/suggest-tags")
-def ai_suggest_tags(payload: TagSuggestRequest):
-    return suggest_tags_from_image(payload.model_dump())
+async def ai_suggest_tags(payload: TagSuggestRequest):
+    return await suggest_tags_from_image(payload.model_dump())
+
+@router.post("/ai/suggest-tags/accept")
+def ai_accept_tags(payload: TagAcceptRequest):
+    """
+    Same fields as /ai/suggest-tags plus the tags the artist finally kept
+    (style, mood, colors, themes, space). Trains the local classifier that
+    answers easy cases without the LLM.
+    """
+    return accept_tags(payload.model_dump())
+
+@router.post("/ai/suggest-tags/bulk")
+async def ai_suggest_tags_bulk(request: Request, start: int = 0, concurrency: int = 0):
+    """
+    Body: JSONL, one TagSuggestRequest per line (an extra "id" is echoed back).
+    Response: JSONL (application/x-ndjson), streamed in input order:
+      {"index": 0, "id": "...", "result": {...}}
+      {"index": 1, "id": "...", "error": "..."}
+    To resume an interrupted run, resend the same body with
+    ?start=<last index received + 1>.
+    """
+    # Read the body before responding: while a StreamingResponse is being
+    # sent, starlette listens for disconnects on the same receive channel
+    body = await request.body()
+    records = suggest_tags_bulk(iter_file_lines(body.decode("utf-8").splitlines()),
+                                start=start, concurrency=concurrency)
+    return StreamingResponse((jsonl(r) async for r in records), media_type="application/x-ndjson",
+                             headers=STREAMING_HEADERS)
@@ -1,8 +1,20 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 
-from app.services.tts_service import synthesize_story_to_mp3
+from app.services.tts_service import (
+    CACHE_DIR,
+    is_synthesized,
+    resolve_tts_request,
+    stream_story_mp3,
+    synthesize_story_to_mp3,
+    tts_rel_path,
+)
+from app.services.tts_jobs import wait_tts_job
+from app.services.llm_stream import STREAMING_HEADERS
+
+MAX_JOB_WAIT_SECONDS = 30.0
 
 router = APIRouter()
 
@@ -25,3 +37,37 @@ async def tts_story(payload: TTSRequest):
         print(f"TTS Route Error: {e}")
         # Fallback to avoid 500
         return {"audioUrl": "/static/tts/fallback.mp3", "note": "AI TTS unavailable, returning fallback."}
+
+@router.post("/tts/story/stream")
+async def tts_story_stream(payload: TTSRequest):
+    """
+    Same input as /tts/story, but answers with the audio itself as chunked
+    audio/mpeg while it is being synthesized, so playback can start after
+    the first sentence. Cached stories are served from disk.
+    X-Audio-Url is the /static URL the finished file is published under.
+    """
+    try:
+        text, voice, key = resolve_tts_request(payload.text, payload.voice, payload.speed or 1.0)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {"X-Audio-Url": f"/static/{tts_rel_path(key)}"}
+    if is_synthesized(key):
+        return FileResponse(CACHE_DIR / f"{key}.mp3", media_type="audio/mpeg", headers=headers)
+    return StreamingResponse(
+        stream_story_mp3(text, voice, payload.speed or 1.0),
+        media_type="audio/mpeg",
+        headers={**headers, **STREAMING_HEADERS},
+    )
+
+@router.get("/tts/jobs/{job_id}")
+async def tts_job_status(job_id: str, wait_seconds: float = 0.0):
+    """
+    Status of a background TTS job (see /ai/buyer-session pre_tts):
+      { "jobId", "status": "pending|running|done|failed", "audioUrl", "statusUrl", "error" }
+    wait_seconds > 0 long-polls until the job finishes (capped at 30s).
+    """
+    handle = await wait_tts_job(job_id, min(max(wait_seconds, 0.0), MAX_JOB_WAIT_SECONDS))
+    if handle is None:
+        raise HTTPException(status_code=404, detail="Unknown TTS job")
+    return handle
@@ -1,87 +1,121 @@
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
 from app.models.artwork import Artwork
 from app.models.user_profile import UserProfile
+from app.models.ai_outputs import CompareOutput, ExplainOutput
 from app.services.openai_client import call_llm_json
+from app.services.llm_stream import stream_llm_json_fields
+from app.services.json_stream import RESET
+from app.services.cache import make_cache_key, cache_get, cache_set
+from app.services.fingerprints import artwork_detail_fingerprint, profile_fingerprint
+from app.services.prompt_builder import artwork_lines, build_prompt, profile_lines
+from app.core import config
 
-def explain_artwork(user: UserProfile, art: Artwork) -> dict:
-    size_str = f'{art.size.width}×{art.size.height}{art.size.unit}'
-    prompt = f"""
-You are an art curator + buying decision assistant for a PHYSICAL art marketplace.
-Your job: give the buyer confidence without making fake claims.
+CACHE_TTL_SECONDS = 60 * 60 * 6  # 6 hours, same as buyer_session
 
-User preferences:
-- style: {user.style}
-- mood: {user.mood}
-- colors: {user.colors}
-- themes: {user.themes}
-- budget: {user.budget.min} to {user.budget.max}
-- space: {user.space}
-
-Artwork:
-- id: {art.id}
-- title: {art.title}
-- artist: {art.artistName}
-- year: {art.year}
-- price: {art.price} {art.currency}
-- size: {size_str}
-- tags: {art.tags}
-- story: {art.story}
+def _explain_cache_key(user: UserProfile, art: Artwork) -> str:
+    return make_cache_key("explain", {
+        "userProfile": profile_fingerprint(user),
+        "artFingerprint": artwork_detail_fingerprint(art),
+    })
+
+EXPLAIN_INSTRUCTIONS = """You are an art curator + buying decision assistant for a PHYSICAL art marketplace.
+Your job: give the buyer confidence without making fake claims.
 
 Return STRICT JSON only in this format:
-{{
+{
   "summary": "1 short persuasive paragraph, not salesy",
   "bullets": ["3 concise reasons tied to user prefs, size/space, and story/tags"],
   "placement": "1 line placement suggestion using size + space",
   "buyer_questions": ["2-3 practical questions for physical purchase (framing/shipping/care)"]
-}}
+}
 
 Rules:
 - Do not invent details not provided
 - Do not mention investment returns
 - Keep the tone supportive, curator-like
 """
-    return call_llm_json(prompt)
-
-def compare_artworks(user: UserProfile, artA: Artwork, artB: Artwork) -> dict:
-    size_A = f'{artA.size.width}×{artA.size.height}{artA.size.unit}'
-    size_B = f'{artB.size.width}×{artB.size.height}{artB.size.unit}'
-    
-    prompt = f"""
-You are a helpful art advisor helping a buyer choose between two pieces.
-Be balanced, objective, but help them reach a conclusion based on their preferences.
 
-User Profile:
-- style: {user.style}
-- mood: {user.mood}
-- colors: {user.colors}
-- themes: {user.themes}
-- budget: {user.budget.min}-{user.budget.max}
-- space: {user.space}
-
-Option A:
-- Title: {artA.title}
-- Artist: {artA.artistName}
-- Price: {artA.price}
-- Size: {size_A}
-- Tags: {artA.tags}
-- Story: {artA.story}
-
-Option B:
-- Title: {artB.title}
-- Artist: {artB.artistName}
-- Price: {artB.price}
-- Size: {size_B}
-- Tags: {artB.tags}
-- Story: {artB.story}
+COMPARE_INSTRUCTIONS = """You are a helpful art advisor helping a buyer choose between two pieces.
+Be balanced, objective, but help them reach a conclusion based on their preferences.
 
 Return STRICT JSON in this format:
-{{
+{
   "verdict": "A" or "B" or "depends",
   "why": "1 sentence summary of the recommendation",
   "differences": [
-    {{ "aspect": "Price", "A": "Higher ($500)", "B": "Lower ($300)" }},
-    {{ "aspect": "Mood", "A": "...", "B": "..." }}
+    { "aspect": "Price", "A": "Higher ($500)", "B": "Lower ($300)" },
+    { "aspect": "Mood", "A": "...", "B": "..." }
   ],
   "confidence_tip": "A closing tip to help them decide (e.g. 'If your room is dark, go with B')"
-}}
+}
+"""
+
+def _explain_prompt(user: UserProfile, art: Artwork) -> str:
+    return build_prompt(
+        EXPLAIN_INSTRUCTIONS,
+        ("User preferences", profile_lines(user)),
+        ("Artwork", artwork_lines(art, config.STORY_TOKEN_BUDGET)),
+    )
+
+def _compare_prompt(user: UserProfile, artA: Artwork, artB: Artwork) -> str:
+    return build_prompt(
+        COMPARE_INSTRUCTIONS,
+        ("User Profile", profile_lines(user)),
+        ("Option A", artwork_lines(artA, config.STORY_TOKEN_BUDGET)),
+        ("Option B", artwork_lines(artB, config.STORY_TOKEN_BUDGET)),
+    )
+
+async def explain_artwork(user: UserProfile, art: Artwork) -> dict:
+    key = _explain_cache_key(user, art)
+    cached = cache_get(key, ttl_seconds=CACHE_TTL_SECONDS)
+    if cached:
+        return cached
+
+    result = await call_llm_json(_explain_prompt(user, art), ExplainOutput)
+    result = ExplainOutput.model_validate(result).model_dump()
+    cache_set(key, result)
+    return result
+
+async def stream_explain_artwork(user: UserProfile, art: Artwork) -> AsyncIterator[Tuple[Optional[str], Any]]:
+    """
+    Streaming explain_artwork: yields ("summary", ...), ("bullets", ...), ...
+    as the model completes each field, then (None, <validated ExplainOutput dict>).
+    (RESET, None): drop the fields received so far (model false start).
+    Cache hits replay the cached fields. Raises on model/validation errors.
     """
-    return call_llm_json(prompt)
+    key = _explain_cache_key(user, art)
+    cached = cache_get(key, ttl_seconds=CACHE_TTL_SECONDS)
+    if cached:
+        for field, value in cached.items():
+            yield field, value
+        yield None, cached
+        return
+
+    fields: Dict[str, Any] = {}
+    async for field, value in stream_llm_json_fields(_explain_prompt(user, art), schema=ExplainOutput):
+        if field is RESET:
+            fields.clear()
+        else:
+            fields[field] = value
+        yield field, value
+
+    result = ExplainOutput.model_validate(fields).model_dump()
+    cache_set(key, result)
+    yield None, result
+
+async def compare_artworks(user: UserProfile, artA: Artwork, artB: Artwork) -> dict:
+    # Keyed on the ordered pair: the free text ("why", "confidence_tip")
+    # refers to the sides as A and B, so B-vs-A is a different answer.
+    key = make_cache_key("compare", {
+        "userProfile": profile_fingerprint(user),
+        "artPair": [artwork_detail_fingerprint(artA), artwork_detail_fingerprint(artB)],
+    })
+    cached = cache_get(key, ttl_seconds=CACHE_TTL_SECONDS)
+    if cached:
+        return cached
+
+    result = await call_llm_json(_compare_prompt(user, artA, artB), CompareOutput)
+    result = CompareOutput.model_validate(result).model_dump()
+    cache_set(key, result)
+    return result
@@ -1,47 +1,24 @@
-from typing import List, Dict
+from typing import Any, AsyncIterator, List, Dict, Optional, Tuple
 from app.models.artwork import Artwork
 from app.models.user_profile import UserProfile
+from app.models.ai_outputs import CurationOutput
 from app.services.openai_client import call_llm_json
+from app.services.llm_stream import stream_llm_json_fields
+from app.services.json_stream import RESET
+from app.services.prompt_builder import build_prompt, candidate_table, profile_lines
+from app.core import config
 
-def ai_curate_top_4(user: UserProfile, candidates: List[Artwork]) -> Dict:
-    # Keep candidate details compact
-    simplified = []
-    for a in candidates:
-        simplified.append({
-            "id": a.id,
-            "title": a.title,
-            "artistName": a.artistName,
-            "year": a.year,
-            "price": a.price,
-            "currency": a.currency,
-            "size": f"{a.size.width}×{a.size.height}{a.size.unit}",
-            "tags": a.tags,
-            "story": (a.story or "")[:220]
-        })
-
-    prompt = f"""
-You are a digital curator for a PHYSICAL art marketplace.
+CURATION_INSTRUCTIONS = """You are a digital curator for a PHYSICAL art marketplace.
 Select the best 4 artworks for the user and explain WHY in a warm, friendly, and enthusiastic tone.
 
-User profile:
-- style: {user.style}
-- mood: {user.mood}
-- colors: {user.colors}
-- themes: {user.themes}
-- budget: {user.budget.min} to {user.budget.max}
-- space: {user.space}
-
-Candidate artworks (already filtered and relevant):
-{simplified}
-
 Return STRICT JSON only:
-{{
+{
+  "curator_welcome": "1 warm and welcoming sentence",
   "top_artwork_ids": ["id1","id2","id3","id4"],
-  "reasons": {{
+  "reasons": {
     "id1": ["reason1","reason2","reason3"]
-  }},
-  "curator_welcome": "1 warm and welcoming sentence"
-}}
+  }
+}
 
 Rules:
 - Do not invent facts beyond provided data.
@@ -49,5 +26,33 @@ Rules:
 - Do not mention investment returns.
 - Use size/space as a real factor where appropriate.
 - If fewer than 4 candidates exist, return as many as possible.
+- Candidates are a table: one artwork per row, columns separated by "|", tags by ",". A story ending in "…" was shortened.
 """
-    return call_llm_json(prompt)
+
+def _curation_prompt(user: UserProfile, candidates: List[Artwork]) -> str:
+    # Keep candidate details compact
+    table = candidate_table(candidates, config.CURATION_TABLE_TOKEN_BUDGET)
+    return build_prompt(
+        CURATION_INSTRUCTIONS,
+        ("User profile", profile_lines(user)),
+        ("Candidate artworks (already filtered and relevant)", table),
+    )
+
+async def ai_curate_top_4(user: UserProfile, candidates: List[Artwork]) -> Dict:
+    # Fields that fail CurationOutput are dropped; the route falls back per field
+    return await call_llm_json(_curation_prompt(user, candidates), CurationOutput)
+
+async def stream_curate_top_4(user: UserProfile, candidates: List[Artwork]) -> AsyncIterator[Tuple[Optional[str], Any]]:
+    """
+    Streaming ai_curate_top_4: yields each top-level field as the model
+    completes it (curator_welcome first), then (None, <full dict>).
+    (RESET, None): drop the fields received so far (model false start).
+    """
+    fields: Dict[str, Any] = {}
+    async for field, value in stream_llm_json_fields(_curation_prompt(user, candidates), schema=CurationOutput):
+        if field is RESET:
+            fields.clear()
+        else:
+            fields[field] = value
+        yield field, value
+    yield None, fields
@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import threading
+from contextlib import aclosing, asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+class _LiveFile:
+    """
+    A file that is still being produced: the chunks so far, readable by any
+    number of listeners while it grows.
+    """
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def _wake(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def append(self, data: bytes) -> None:
+        self.chunks.append(data)
+        self._wake()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        self._wake()
+
+    async def follow(self) -> AsyncIterator[bytes]:
+        sent = 0
+        while True:
+            changed = self.changed
+            while sent < len(self.chunks):
+                yield self.chunks[sent]
+                sent += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+
+class AudioStore:
+    """
+    Content-addressed audio files under one directory (names are relative
+    paths such as "<key>.mp3" or "segments/<key>.mp3").
+    - writes go to a temp file that is renamed into place, so a reader never
+      sees a partial file
+    - a per-name asyncio lock lets exactly one task produce each file; the
+      others wait and then find it on disk
+    - stream() serves a file while it is being produced: one background
+      producer per name, listeners just read what it has made so far
+    - total size is kept under max_bytes by evicting least recently used
+      files (access time as tracked here, not the filesystem's atime)
+    - an index file (name -> size, last access) makes hits a dict lookup
+      instead of stat calls; it is rebuilt with one scan if missing
+    - the index is written by a background thread (soon after a file is
+      added or removed, every index_flush_seconds for access times, and at
+      exit), never on the event loop
+    - single process: the index and the quota belong to the process that
+      owns it. Several workers sharing one directory would each keep their
+      own view and overwrite each other's index file, so run TTS in one
+      worker (or give each worker its own directory and index path).
+    """
+
+    def __init__(self, directory: Path, index_path: Path, max_bytes: int,
+                 index_flush_seconds: float = 30.0):
+        self.directory = directory
+        self.index_path = index_path
+        self.max_bytes = max_bytes
+        self.index_flush_seconds = index_flush_seconds
+        self.lock = threading.Lock()
+        self.index: Optional[Dict[str, Dict[str, float]]] = None
+        self.total_bytes = 0
+        self.evictions = 0
+        self.dirty = False
+        self.save_lock = threading.Lock()  # one index writer at a time
+        self.save_due = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._key_locks: Dict[str, asyncio.Lock] = {}
+        self._key_waiters: Dict[str, int] = {}
+        self._live: Dict[str, _LiveFile] = {}
+
+    # ---- index ----
+
+    def _load_index(self) -> Dict[str, Dict[str, float]]:
+        # caller holds self.lock
+        if self.index is None:
+            index = None
+            try:
+                index = json.loads(self.index_path.read_text(encoding="utf-8"))
+            except Exception:
+                pass
+            if not isinstance(index, dict):
+                index = self._scan()
+                self._mark_dirty(soon=True)
+            self.index = index
+            self.total_bytes = sum(int(e.get("size", 0)) for e in index.values())
+        return self.index
+
+    def _scan(self) -> Dict[str, Dict[str, float]]:
+        index = {}
+        for path in self.directory.rglob("*.mp3"):
+            if path.name.startswith("."):
+                continue  # temp files of an interrupted write
+            st = path.stat()
+            if st.st_size > 0:
+                name = path.relative_to(self.directory).as_posix()
+                index[name] = {"size": st.st_size, "atime": st.st_mtime}
+        return index
+
+    def _mark_dirty(self, soon: bool = False) -> None:
+        # caller holds self.lock; the flusher thread writes the index
+        self.dirty = True
+        if soon:
+            self.save_due.set()
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_forever, name="tts-index-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_forever(self) -> None:
+        while True:
+            self.save_due.wait(self.index_flush_seconds)
+            self.save_due.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"TTS index flush error: {e}")
+
+    def flush(self) -> None:
+        """
+        Writes the index if it changed (serialized under the lock, written
+        outside it).
+        """
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty or self.index is None:
+                    return
+                text = json.dumps(self.index, separators=(",", ":"))
+                self.dirty = False
+            try:
+                self.index_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.index_path.with_name(f".{self.index_path.name}.{uuid.uuid4().hex}.tmp")
+                tmp.write_text(text, encoding="utf-8")
+                os.replace(tmp, self.index_path)
+            except Exception:
+                with self.lock:
+                    self.dirty = True
+                raise
+
+    # ---- lookups ----
+
+    def path(self, name: str) -> Path:
+        return self.directory / name
+
+    def has(self, name: str) -> bool:
+        """
+        True if the file is in the store; counts as an access for LRU.
+        """
+        with self.lock:
+            entry = self._load_index().get(name)
+            if entry is None:
+                return False
+            entry["atime"] = time.time()
+            self._mark_dirty()
+            return True
+
+    def read(self, name: str) -> Optional[bytes]:
+        if not self.has(name):
+            return None
+        try:
+            return self.path(name).read_bytes()
+        except FileNotFoundError:
+            self.discard(name)  # removed behind our back
+            return None
+
+    # ---- writes ----
+
+    def tmp_path(self, name: str) -> Path:
+        path = self.path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # unique per writer: concurrent tasks may write the same name
+        return path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+
+    def commit(self, name: str, tmp: Path) -> Path:
+        """
+        Publishes a finished temp file under `name` and enforces the quota.
+        """
+        path = self.path(name)
+        size = tmp.stat().st_size
+        if size == 0:
+            tmp.unlink(missing_ok=True)
+            raise ValueError(f"refusing to publish empty audio file {name}")
+        os.replace(tmp, path)
+        with self.lock:
+            index = self._load_index()
+            self.total_bytes += size - int(index.get(name, {}).get("size", 0))
+            index[name] = {"size": size, "atime": time.time()}
+            self._evict_over_quota(keep=name)
+            self._mark_dirty(soon=True)
+        return path
+
+    def discard(self, name: str) -> None:
+        with self.lock:
+            entry = self._load_index().pop(name, None)
+            if entry is not None:
+                self.total_bytes -= int(entry.get("size", 0))
+                self._mark_dirty(soon=True)
+        self.path(name).unlink(missing_ok=True)
+
+    def _evict_over_quota(self, keep: str) -> None:
+        # caller holds self.lock
+        if self.total_bytes <= self.max_bytes:
+            return
+        for name, entry in sorted(self.index.items(), key=lambda kv: kv[1]["atime"]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            del self.index[name]
+            self.total_bytes -= int(entry.get("size", 0))
+            self.path(name).unlink(missing_ok=True)
+            self.evictions += 1
+
+    # ---- single producer per name ----
+
+    @asynccontextmanager
+    async def key_lock(self, name: str):
+        """
+        Held while producing `name`; re-check has() after acquiring it.
+        """
+        lock = self._key_locks.setdefault(name, asyncio.Lock())
+        self._key_waiters[name] = self._key_waiters.get(name, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._key_waiters[name] -= 1
+            if self._key_waiters[name] == 0:
+                del self._key_waiters[name]
+                del self._key_locks[name]
+
+    async def get_or_create(self, name: str, produce: Callable[[Path], Awaitable[None]]) -> bytes:
+        """
+        Returns the file's bytes, calling produce(tmp_path) first if it is not
+        stored yet. Concurrent callers for the same name share one produce().
+        """
+        data = self.read(name)
+        if data is not None:
+            return data
+
+        async with self.key_lock(name):
+            data = self.read(name)
+            if data is not None:
+                return data
+            tmp = self.tmp_path(name)
+            try:
+                await produce(tmp)
+                self.commit(name, tmp)
+            finally:
+                tmp.unlink(missing_ok=True)
+            return self.path(name).read_bytes()
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "files": len(self._load_index()),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+    # ---- streaming while producing ----
+
+    async def stream(self, name: str, produce: Callable[[], AsyncIterator[bytes]]) -> AsyncIterator[bytes]:
+        """
+        Chunks of `name`: the stored file, or the output of produce() while
+        it runs. produce() runs once per name in its own task, teeing into a
+        temp file committed when complete; no lock is held while yielding,
+        so a slow or stalled listener never holds up anyone else. A listener
+        leaving early does not stop the producer (the file still lands).
+        """
+        data = self.read(name)
+        if data is not None:
+            yield data
+            return
+
+        live = self._live.get(name)
+        if live is None:
+            live = _LiveFile()
+            self._live[name] = live
+            live.task = asyncio.ensure_future(self._produce_live(name, live, produce))
+
+        async with aclosing(live.follow()) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+    async def _produce_live(self, name: str, live: _LiveFile,
+                            produce: Callable[[], AsyncIterator[bytes]]) -> None:
+        error: Optional[BaseException] = None
+        try:
+            # same lock as get_or_create: never two producers for one name
+            async with self.key_lock(name):
+                data = self.read(name)
+                if data is not None:
+                    live.append(data)
+                    return
+                tmp = self.tmp_path(name)
+                try:
+                    with open(tmp, "wb") as f:
+                        async with aclosing(produce()) as chunks:
+                            async for chunk in chunks:
+                                f.write(chunk)
+                                live.append(chunk)
+                    self.commit(name, tmp)
+                finally:
+                    tmp.unlink(missing_ok=True)
+        except Exception as e:
+            error = e
+        finally:
+            del self._live[name]
+            live.finish(error)
@@ -0,0 +1,117 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from app.models.artwork import Artwork
+from app.models.user_profile import UserProfile
+from app.models.taxonomy import taxonomy
+
+# Same weights as score_artwork (per matching tag)
+STYLE_WEIGHT = 4
+MOOD_WEIGHT = 3
+COLOR_WEIGHT = 2
+THEME_WEIGHT = 2
+
+OUT_OF_BUDGET_SCORE = -100
+IN_BUDGET_BONUS = 5
+SPACE_BONUS = 2
+SPACE_AREA_THRESHOLD = 5000
+
+
+class CatalogColumns:
+    """
+    Columnar view of a list of artworks, built once and scored in one pass.
+    - every tag occurrence is stored flat as (tag id, row), so duplicate
+      tags on an artwork count exactly like the per-tag loop in score_artwork
+    - tag ids are taxonomy ids; free-form tags get ids after those that are
+      local to this object (self.local_ids), never registered globally
+    - price and area are float64 columns
+    Works on Artwork models and on compact ArtworkRecords alike.
+    """
+
+    def __init__(self, artworks: Sequence[Artwork]):
+        self.artworks: List[Artwork] = list(artworks)
+
+        self.local_ids: Dict[str, int] = {}
+        n = len(self.artworks)
+
+        # raw spelling -> tag id: each distinct spelling is resolved once
+        spelling_ids: Dict[str, int] = {}
+
+        def resolve(tag: str) -> int:
+            tid = taxonomy.match_key(tag)
+            if not isinstance(tid, int):
+                tid = self.local_ids.setdefault(tid, len(taxonomy) + len(self.local_ids))
+            spelling_ids[tag] = tid
+            return tid
+
+        row_tags = [art.tags for art in self.artworks]
+        flat = [tag for tags in row_tags for tag in tags]
+
+        self.tag_ids = np.fromiter(
+            (spelling_ids[t] if t in spelling_ids else resolve(t) for t in flat),
+            dtype=np.int64, count=len(flat),
+        )
+        self.tag_rows = np.repeat(np.arange(n, dtype=np.int64), [len(tags) for tags in row_tags])
+        self.price = np.fromiter((art.price for art in self.artworks), dtype=np.float64, count=n)
+        self.area = np.fromiter((art.area for art in self.artworks), dtype=np.float64, count=n)
+
+    def __len__(self) -> int:
+        return len(self.artworks)
+
+    def tag_weights(self, user: UserProfile) -> np.ndarray:
+        """
+        Per-tag-id weight for this user (a tag can be in several lists).
+        """
+        weights = np.zeros(len(taxonomy) + len(self.local_ids), dtype=np.int64)
+        for tags, w in (
+            (user.style, STYLE_WEIGHT),
+            (user.mood, MOOD_WEIGHT),
+            (user.colors, COLOR_WEIGHT),
+            (user.themes, THEME_WEIGHT),
+        ):
+            for key in taxonomy.keys(tags):
+                tid = key if isinstance(key, int) else self.local_ids.get(key)
+                if tid is not None:
+                    weights[tid] += w
+        return weights
+
+
+def score_catalog(columns: CatalogColumns, user: UserProfile) -> np.ndarray:
+    """
+    Scores every artwork in `columns` against `user`.
+    Returns an int64 array identical to [score_artwork(a, user) for a in artworks].
+    """
+    n = len(columns)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    weights = columns.tag_weights(user)
+    tag_score = np.bincount(
+        columns.tag_rows,
+        weights=weights[columns.tag_ids],
+        minlength=n,
+    ).astype(np.int64)
+
+    # NaN-safe: written the same way as score_artwork's budget check
+    out_of_budget = (columns.price < user.budget.min) | (columns.price > user.budget.max)
+
+    if user.space == "bedroom":
+        space_bonus = np.where(columns.area <= SPACE_AREA_THRESHOLD, SPACE_BONUS, 0)
+    elif user.space == "living_room":
+        space_bonus = np.where(columns.area >= SPACE_AREA_THRESHOLD, SPACE_BONUS, 0)
+    else:
+        space_bonus = 0
+
+    scores = tag_score + IN_BUDGET_BONUS + space_bonus
+    return np.where(out_of_budget, OUT_OF_BUDGET_SCORE, scores).astype(np.int64)
+
+
+def ranked_rows(scores: np.ndarray) -> np.ndarray:
+    """
+    Row indices of positive scores, best first.
+    Ties keep input order (same as a stable sort with reverse=True).
+    """
+    positive = np.flatnonzero(scores > 0)
+    order = np.argsort(-scores[positive], kind="stable")
+    return positive[order]
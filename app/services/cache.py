@@ -1,51 +1,208 @@
+import atexit
+import copy
 import json
 import time
 import hashlib
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Optional, Dict
+from typing import Any, Optional, Dict, Tuple
+
+import orjson
+
+from app.core import config
+from app.services.cache_backends import CacheBackend, JsonFileBackend, SqliteBackend
 
 CACHE_DIR = Path("app/cache")
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
+_DIGITS_TO_ZERO = bytes.maketrans(b"123456789", b"000000000")
+
+def _orjson_may_differ(data: bytes) -> bool:
+    # Where orjson's text can differ from json.dumps: exponent floats ("1e16"
+    # vs "1e+16": a digit then "e"), small floats ("0.00001" vs "1e-05") and
+    # NaN/Infinity (orjson writes null). Strings can match too; that only
+    # costs a json.dumps. (bytes scans, much faster than a regex here)
+    return b"0e" in data.translate(_DIGITS_TO_ZERO) or b".0000" in data or b"null" in data
+
+def _stable_json_bytes(obj: Any) -> bytes:
+    """
+    Same bytes as json.dumps(sort_keys=True, ensure_ascii=False, compact
+    separators) encoded as UTF-8, so existing cache keys stay valid;
+    orjson does the work whenever its output is guaranteed identical.
+    """
+    try:
+        data = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+        if not _orjson_may_differ(data):
+            return data
+    except TypeError:
+        pass  # non-str keys, ints over 64 bits, ...: json handles or raises
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
 def _stable_json(obj: Any) -> str:
     """
     Stable serialization so hashing is consistent.
     """
-    return json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return _stable_json_bytes(obj).decode("utf-8")
 
 def make_cache_key(prefix: str, payload: Any) -> str:
-    raw = (prefix + "|" + _stable_json(payload)).encode("utf-8")
+    raw = prefix.encode("utf-8") + b"|" + _stable_json_bytes(payload)
     digest = hashlib.sha256(raw).hexdigest()
     return f"{prefix}_{digest}"
 
-def cache_get(key: str, ttl_seconds: Optional[int] = None) -> Optional[Dict[str, Any]]:
-    path = CACHE_DIR / f"{key}.json"
-    if not path.exists():
-        return None
 
-    try:
-        data = json.loads(path.read_text(encoding="utf-8"))
-    except Exception:
-        return None
+class _Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "memory_evictions": 0,
+            "swept": 0,
+        }
 
-    if ttl_seconds is not None:
-        saved_at = data.get("_saved_at")
-        if not isinstance(saved_at, (int, float)):
+    def incr(self, name: str, n: int = 1) -> None:
+        with self.lock:
+            self.counts[name] += n
+
+
+class _MemoryLRU:
+    """
+    In-process tier: key -> (saved_at, value, cached_at), least recently used
+    first. ttl_seconds bounds how long an entry stays in memory (counted from
+    when it entered this tier); the caller's ttl still applies to saved_at.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, stats: _Stats):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = stats
+        self.lock = threading.Lock()
+        self.items: "OrderedDict[str, Tuple[float, Dict[str, Any], float]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            if time.time() - item[2] > self.ttl_seconds:
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return item[0], item[1]
+
+    def set(self, key: str, saved_at: float, value: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.items[key] = (saved_at, value, time.time())
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_entries:
+                self.items.popitem(last=False)
+                self.stats.incr("memory_evictions")
+
+    def pop(self, key: str) -> None:
+        with self.lock:
+            self.items.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+def _make_backend() -> CacheBackend:
+    if config.CACHE_BACKEND == "json":
+        return JsonFileBackend(
+            CACHE_DIR, config.CACHE_DISK_MAX_ENTRIES, config.CACHE_DISK_MAX_BYTES, _stable_json
+        )
+    return SqliteBackend(
+        Path(config.CACHE_SQLITE_PATH),
+        config.CACHE_DISK_MAX_ENTRIES,
+        config.CACHE_DISK_MAX_BYTES,
+        _stable_json,
+        batch_size=config.CACHE_WRITE_BATCH_SIZE,
+        flush_interval_seconds=config.CACHE_FLUSH_INTERVAL_SECONDS,
+    )
+
+_stats = _Stats()
+_memory = _MemoryLRU(config.CACHE_MEMORY_MAX_ENTRIES, config.CACHE_MEMORY_TTL_SECONDS, _stats)
+_disk = _make_backend()
+atexit.register(_disk.flush)
+
+_sweeper_lock = threading.Lock()
+_sweeper: Optional[threading.Thread] = None
+
+def _sweep_forever() -> None:
+    # Flushes buffered writes every tick, sweeps expired entries less often
+    last_sweep = time.time()
+    while True:
+        # returns early when a write batch fills up
+        _disk.wait_for_flush(max(1, min(config.CACHE_FLUSH_INTERVAL_SECONDS, config.CACHE_SWEEP_INTERVAL_SECONDS)))
+        try:
+            _disk.flush()
+            if time.time() - last_sweep >= config.CACHE_SWEEP_INTERVAL_SECONDS:
+                last_sweep = time.time()
+                _stats.incr("swept", _disk.sweep(config.CACHE_MAX_AGE_SECONDS))
+        except Exception as e:
+            print(f"Cache sweep error: {e}")
+
+def start_cache_sweeper() -> None:
+    """
+    Starts the background thread that flushes writes and removes expired
+    entries (idempotent).
+    """
+    global _sweeper
+    with _sweeper_lock:
+        if _sweeper is None:
+            _sweeper = threading.Thread(target=_sweep_forever, name="cache-sweeper", daemon=True)
+            _sweeper.start()
+
+def cache_get(key: str, ttl_seconds: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    hit = _memory.get(key)
+    tier = "memory_hits"
+    if hit is None:
+        hit = _disk.get(key)
+        tier = "disk_hits"
+        if hit is None:
+            _stats.incr("misses")
             return None
+    saved_at, value = hit
+
+    if ttl_seconds is not None:
         if time.time() - saved_at > ttl_seconds:
             # expired
-            try:
-                path.unlink(missing_ok=True)
-            except Exception:
-                pass
+            _memory.pop(key)
+            _disk.delete(key)
+            _stats.incr("expired")
+            _stats.incr("misses")
             return None
 
-    # Return cached payload (without metadata)
-    data.pop("_saved_at", None)
-    return data
+    if tier == "disk_hits":
+        # promote, so hot keys are served from memory next time
+        _memory.set(key, saved_at, value)
+
+    _stats.incr(tier)
+    # Callers may mutate the result; never hand out the cached object itself
+    return copy.deepcopy(value)
 
 def cache_set(key: str, value: Dict[str, Any]) -> None:
-    path = CACHE_DIR / f"{key}.json"
-    payload = dict(value)
-    payload["_saved_at"] = time.time()
-    path.write_text(_stable_json(payload), encoding="utf-8")
+    start_cache_sweeper()
+
+    saved_at = time.time()
+    _disk.set(key, saved_at, value)
+    _memory.set(key, saved_at, copy.deepcopy(value))
+
+def cache_stats() -> Dict[str, Any]:
+    with _stats.lock:
+        counts = dict(_stats.counts)
+    hits = counts["memory_hits"] + counts["disk_hits"]
+    lookups = hits + counts["misses"]
+    counts["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+    counts["memory_hit_rate"] = round(counts["memory_hits"] / lookups, 4) if lookups else 0.0
+    counts["memory_entries"] = len(_memory)
+    counts["disk_evictions"] = _disk.evictions
+    counts["disk_entries"] = _disk.entries()
+    counts["disk_bytes"] = _disk.size_bytes()
+    counts["backend"] = type(_disk).__name__
+    return counts
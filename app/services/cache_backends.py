@@ -0,0 +1,366 @@
+import os
+import sqlite3
+import time
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import orjson
+
+Entry = Tuple[float, Dict[str, Any]]  # (saved_at, value)
+
+
+class CacheBackend(ABC):
+    """
+    Persistent tier behind the in-memory LRU in app/services/cache.py.
+    Values are JSON-serializable dicts; `dumps` is the serializer cache.py
+    also hashes with, so stored bytes stay stable.
+    """
+
+    evictions = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Entry]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, saved_at: float, value: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def sweep(self, max_age_seconds: int) -> int:
+        ...
+
+    def flush(self) -> None:
+        pass
+
+    def wait_for_flush(self, timeout: float) -> None:
+        """
+        Called by the sweeper thread between flushes; backends that buffer
+        writes return early once a flush is due.
+        """
+        time.sleep(timeout)
+
+    @abstractmethod
+    def entries(self) -> int:
+        ...
+
+    @abstractmethod
+    def size_bytes(self) -> int:
+        ...
+
+
+class JsonFileBackend(CacheBackend):
+    """
+    One JSON file per key (the original layout), bounded by entry count and
+    bytes. Writes go to a temp file and are renamed into place, so a crash
+    never leaves a half-written entry. The LRU index (key -> size) is built
+    from one directory scan on first use, ordered by mtime.
+    """
+
+    def __init__(self, directory: Path, max_entries: int, max_bytes: int,
+                 dumps: Callable[[Any], str]):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.dumps = dumps
+        self.lock = threading.Lock()
+        self.index: "Optional[OrderedDict[str, int]]" = None
+        self.total_bytes = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        if self.index is None:
+            entries = []
+            with os.scandir(self.directory) as it:
+                for e in it:
+                    if e.is_file() and e.name.endswith(".json"):
+                        st = e.stat()
+                        entries.append((st.st_mtime, e.name[:-5], st.st_size))
+            entries.sort()
+            self.index = OrderedDict((key, size) for _, key, size in entries)
+            self.total_bytes = sum(self.index.values())
+        return self.index
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self.lock:
+            index = self._load_index()
+            if key not in index:
+                return None
+            index.move_to_end(key)
+
+        try:
+            data = orjson.loads(self._path(key).read_bytes())
+        except Exception:
+            return None
+        saved_at = data.pop("_saved_at", None)
+        if not isinstance(saved_at, (int, float)):
+            return None
+        return saved_at, data
+
+    def set(self, key: str, saved_at: float, value: Dict[str, Any]) -> None:
+        payload = dict(value)
+        payload["_saved_at"] = saved_at
+        data = self.dumps(payload).encode("utf-8")
+
+        path = self._path(key)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+        with self.lock:
+            index = self._load_index()
+            self.total_bytes += len(data) - index.get(key, 0)
+            index[key] = len(data)
+            index.move_to_end(key)
+            self._evict_over_limits()
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            index = self._load_index()
+            self.total_bytes -= index.pop(key, 0)
+        try:
+            self._path(key).unlink(missing_ok=True)
+        except Exception:
+            pass
+
+    def _evict_over_limits(self) -> None:
+        # caller holds self.lock
+        index = self.index
+        while index and (len(index) > self.max_entries or self.total_bytes > self.max_bytes):
+            key, size = index.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                self._path(key).unlink(missing_ok=True)
+            except Exception:
+                pass
+            self.evictions += 1
+
+    def sweep(self, max_age_seconds: int) -> int:
+        # mtime == write time == _saved_at
+        cutoff = time.time() - max_age_seconds
+        with self.lock:
+            keys = list(self._load_index().keys())
+
+        removed = 0
+        for key in keys:
+            try:
+                if self._path(key).stat().st_mtime < cutoff:
+                    self.delete(key)
+                    removed += 1
+            except FileNotFoundError:
+                self.delete(key)
+        return removed
+
+    def entries(self) -> int:
+        with self.lock:
+            return len(self._load_index())
+
+    def size_bytes(self) -> int:
+        return self.total_bytes
+
+
+class SqliteBackend(CacheBackend):
+    """
+    All entries in one SQLite file (WAL mode).
+    - writes are buffered and committed in a single transaction per batch,
+      always by the background thread in cache.py (woken early when a batch
+      fills up), never on a request; a failed batch is kept and retried
+    - saved_at / accessed_at are indexed, so expiry and LRU eviction are
+      range deletes instead of directory scans
+    - access times are buffered too and written with the next batch
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        saved_at REAL NOT NULL,
+        accessed_at REAL NOT NULL,
+        size INTEGER NOT NULL,
+        value TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS entries_saved_at ON entries(saved_at);
+    CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries(accessed_at);
+    """
+
+    def __init__(self, path: Path, max_entries: int, max_bytes: int,
+                 dumps: Callable[[Any], str], batch_size: int = 64,
+                 flush_interval_seconds: float = 1.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.dumps = dumps
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.lock = threading.RLock()
+        self.evictions = 0
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        # reads use their own connection: with WAL they never wait for a
+        # write transaction (and never see one half-done)
+        self.read_conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+
+        # key -> (saved_at, text) pending insert, or None pending delete
+        self.pending: Dict[str, Optional[Tuple[float, str]]] = {}
+        self.touched: Dict[str, float] = {}
+        # the batch currently being written (still visible to get())
+        self.inflight: Dict[str, Optional[Tuple[float, str]]] = {}
+        self.last_flush = time.time()
+        # one writer at a time; self.lock only guards the buffers
+        self.flush_lock = threading.Lock()
+        self.flush_due = threading.Event()
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self.lock:
+            buffered = self.pending if key in self.pending else self.inflight
+            if key in buffered:
+                item = buffered[key]
+                if item is None:
+                    return None
+                saved_at, text = item
+            else:
+                row = self.read_conn.execute(
+                    "SELECT saved_at, value FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                saved_at, text = row
+            self.touched[key] = time.time()
+
+        try:
+            return saved_at, orjson.loads(text)
+        except Exception:
+            return None
+
+    def set(self, key: str, saved_at: float, value: Dict[str, Any]) -> None:
+        text = self.dumps(value)
+        with self.lock:
+            self.pending[key] = (saved_at, text)
+            self.touched.pop(key, None)
+            self._maybe_flush()
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            self.pending[key] = None
+            self.touched.pop(key, None)
+            self._maybe_flush()
+
+    def _maybe_flush(self) -> None:
+        # Never writes on the caller's (request's) thread: a flush can wait
+        # for sqlite's busy timeout. Wakes the sweeper thread instead.
+        if (len(self.pending) >= self.batch_size
+                or time.time() - self.last_flush >= self.flush_interval_seconds):
+            self.flush_due.set()
+
+    def wait_for_flush(self, timeout: float) -> None:
+        self.flush_due.wait(timeout)
+        self.flush_due.clear()
+
+    def flush(self) -> None:
+        with self.flush_lock:
+            with self.lock:
+                self.last_flush = time.time()
+                if not self.pending and not self.touched:
+                    return
+                pending, self.pending = self.pending, {}
+                touched, self.touched = self.touched, {}
+                self.inflight = pending
+
+            written = self._write(pending, touched)
+
+            with self.lock:
+                self.inflight = {}
+                if not written:
+                    # keep the batch for the next flush; newer writes win
+                    for key, item in pending.items():
+                        self.pending.setdefault(key, item)
+                    for key, t in touched.items():
+                        self.touched.setdefault(key, t)
+
+    def _write(self, pending: Dict[str, Optional[Tuple[float, str]]], touched: Dict[str, float]) -> bool:
+        # caller holds self.flush_lock
+        upserts, deletes = [], []
+        for key, item in pending.items():
+            if item is None:
+                deletes.append((key,))
+            else:
+                saved_at, text = item
+                upserts.append((key, saved_at, saved_at, len(text.encode("utf-8")), text))
+
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            if upserts:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, saved_at, accessed_at, size, value) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    upserts,
+                )
+            if deletes:
+                self.conn.executemany("DELETE FROM entries WHERE key = ?", deletes)
+            if touched:
+                self.conn.executemany(
+                    "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                    [(t, key) for key, t in touched.items()],
+                )
+            self._evict_over_limits()
+            self.conn.execute("COMMIT")
+            return True
+        except Exception as e:
+            # BEGIN itself can fail (locked by another process): then there
+            # is nothing to roll back
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+            print(f"Cache flush error: {e}")
+            return False
+
+    def _evict_over_limits(self) -> None:
+        # caller holds self.flush_lock inside an open transaction
+        count, total = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        while count > self.max_entries or total > self.max_bytes:
+            rows = self.conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed_at LIMIT 256"
+            ).fetchall()
+            if not rows:
+                break
+            victims = []
+            for key, size in rows:
+                if count <= self.max_entries and total <= self.max_bytes:
+                    break
+                victims.append((key,))
+                count -= 1
+                total -= size
+            self.conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+            self.evictions += len(victims)
+
+    def sweep(self, max_age_seconds: int) -> int:
+        cutoff = time.time() - max_age_seconds
+        self.flush()
+        with self.flush_lock:
+            cur = self.conn.execute("DELETE FROM entries WHERE saved_at < ?", (cutoff,))
+            return cur.rowcount
+
+    # Stats read what is committed (as of the last flush): flushing here
+    # would write on the caller's thread (GET /cache/stats)
+
+    def entries(self) -> int:
+        with self.lock:
+            return self.read_conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def size_bytes(self) -> int:
+        with self.lock:
+            return self.read_conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
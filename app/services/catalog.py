@@ -0,0 +1,286 @@
+import heapq
+import math
+import sqlite3
+import threading
+import uuid
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List, Optional
+
+from app.core import config
+from app.models.artwork import Artwork
+from app.models.user_profile import UserProfile
+from app.models.taxonomy import taxonomy
+from app.services.batch_scoring import (
+    STYLE_WEIGHT, MOOD_WEIGHT, COLOR_WEIGHT, THEME_WEIGHT,
+    IN_BUDGET_BONUS, SPACE_BONUS, SPACE_AREA_THRESHOLD,
+)
+
+
+class ArtworkCatalog:
+    """
+    Server-resident artwork store, so clients don't have to post the full
+    catalog on every /ai/recommend or /ai/buyer-session call.
+
+    Indexes:
+    - tag match key -> {artwork id: occurrences}   (inverted index, keeps duplicate tags)
+    - sorted (price, id) lists           (budget filter becomes a range lookup)
+
+    With a `path` the artworks live in SQLite and the indexes are a copy:
+    the catalog survives restarts, and every worker process reloads its copy
+    when another one has changed the stored revision. Without one (tests)
+    the catalog only exists in this process.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS artworks (
+        id TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL,
+        data TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self._lock = threading.RLock()
+        self._reset()
+
+        # Changes on every mutation; a fresh epoch per catalog keeps cache
+        # keys from an older catalog from matching a different one.
+        self._epoch = uuid.uuid4().hex[:12]
+        self._version = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._loaded: Optional[str] = None  # stored revision the indexes reflect
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(self.SCHEMA)
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?), ('version', '0')",
+                (self._epoch,),
+            )
+            with self._lock:
+                self._sync()
+
+    def _reset(self) -> None:
+        self._artworks: Dict[str, Artwork] = {}
+        self._area: Dict[str, float] = {}
+        self._seq: Dict[str, int] = {}  # first-insert order, used to break ties
+        self._next_seq = 0
+
+        self._tag_index: Dict[Hashable, Dict[str, int]] = {}
+        self._price_keys: List[float] = []
+        self._price_ids: List[str] = []
+
+    @property
+    def revision(self) -> str:
+        with self._lock:
+            self._sync()
+            return f"{self._epoch}:{self._version}"
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._sync()
+            return len(self._artworks)
+
+    def get(self, artwork_id: str) -> Optional[Artwork]:
+        with self._lock:
+            self._sync()
+            return self._artworks.get(artwork_id)
+
+    # ---- persistence ----
+
+    def _sync(self) -> None:
+        # caller holds self._lock; reloads if the stored revision moved on
+        if self._conn is None:
+            return
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        stored = f"{meta['epoch']}:{meta['version']}"
+        if stored == self._loaded:
+            return
+
+        self._reset()
+        for aid, seq, data in self._conn.execute("SELECT id, seq, data FROM artworks ORDER BY seq"):
+            self._add(Artwork.model_validate_json(data), seq)
+        self._epoch, self._version = meta["epoch"], int(meta["version"])
+        self._loaded = stored
+
+    def _begin(self) -> None:
+        # caller holds self._lock; other processes wait until _commit
+        if self._conn is not None:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._sync()
+            except Exception:
+                self._rollback()
+                raise
+
+    def _commit(self) -> None:
+        self._version += 1
+        if self._conn is not None:
+            self._conn.execute("UPDATE meta SET value = ? WHERE key = 'version'", (str(self._version),))
+            self._conn.execute("COMMIT")
+            self._loaded = f"{self._epoch}:{self._version}"
+
+    def _rollback(self) -> None:
+        if self._conn is not None:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            # the indexes may be ahead of the database: reload on next use
+            self._loaded = None
+
+    # ---- mutations ----
+
+    def upsert(self, artworks: Iterable[Artwork]) -> int:
+        artworks = list(artworks)
+        for art in artworks:
+            # NaN/inf would break the sorted price index
+            if not math.isfinite(art.price):
+                raise ValueError(f"Artwork {art.id} has a non-finite price")
+
+        with self._lock:
+            self._begin()
+            try:
+                for art in artworks:
+                    self._remove_from_indexes(art.id)
+                    self._add(art, self._seq.get(art.id))
+                if self._conn is not None:
+                    self._conn.executemany(
+                        "INSERT INTO artworks (id, seq, data) VALUES (?, ?, ?) "
+                        "ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                        [(art.id, self._seq[art.id], art.model_dump_json()) for art in artworks],
+                    )
+                self._commit()
+            except Exception:
+                self._rollback()
+                raise
+        return len(artworks)
+
+    def delete(self, artwork_id: str) -> bool:
+        with self._lock:
+            self._begin()
+            try:
+                if artwork_id not in self._artworks:
+                    self._rollback()
+                    return False
+                self._remove_from_indexes(artwork_id)
+                del self._artworks[artwork_id]
+                del self._area[artwork_id]
+                del self._seq[artwork_id]
+                if self._conn is not None:
+                    self._conn.execute("DELETE FROM artworks WHERE id = ?", (artwork_id,))
+                self._commit()
+                return True
+            except Exception:
+                self._rollback()
+                raise
+
+    def _add(self, art: Artwork, seq: Optional[int]) -> None:
+        # caller holds self._lock and removed any older version of art.id
+        self._artworks[art.id] = art
+        self._area[art.id] = art.size.width * art.size.height
+        if seq is None:
+            seq = self._next_seq
+        self._seq[art.id] = seq
+        self._next_seq = max(self._next_seq, seq + 1)
+
+        for tag in art.tags:
+            tid = taxonomy.match_key(tag)
+            postings = self._tag_index.setdefault(tid, {})
+            postings[art.id] = postings.get(art.id, 0) + 1
+
+        pos = bisect_right(self._price_keys, art.price)
+        self._price_keys.insert(pos, art.price)
+        self._price_ids.insert(pos, art.id)
+
+    def _remove_from_indexes(self, artwork_id: str) -> None:
+        old = self._artworks.get(artwork_id)
+        if old is None:
+            return
+
+        for tid in taxonomy.keys(old.tags):
+            postings = self._tag_index.get(tid)
+            if postings is not None:
+                postings.pop(artwork_id, None)
+                if not postings:
+                    del self._tag_index[tid]
+
+        lo = bisect_left(self._price_keys, old.price)
+        hi = bisect_right(self._price_keys, old.price)
+        for i in range(lo, hi):
+            if self._price_ids[i] == artwork_id:
+                del self._price_keys[i]
+                del self._price_ids[i]
+                break
+
+    # ---- queries ----
+
+    def in_budget_ids(self, min_price: float, max_price: float) -> List[str]:
+        lo = bisect_left(self._price_keys, min_price)
+        hi = bisect_right(self._price_keys, max_price)
+        return self._price_ids[lo:hi]
+
+    def score_candidates(self, user: UserProfile) -> Dict[str, int]:
+        """
+        Scores for every in-budget artwork, identical to score_artwork.
+        Out-of-budget artworks never score > 0, so they are skipped entirely;
+        tag weights are only accumulated for ids found in the user's postings.
+        """
+        with self._lock:
+            self._sync()
+            candidates = self.in_budget_ids(user.budget.min, user.budget.max)
+            if not candidates:
+                return {}
+            candidate_set = set(candidates)
+
+            weights: Dict[Hashable, int] = {}
+            for tags, w in (
+                (user.style, STYLE_WEIGHT),
+                (user.mood, MOOD_WEIGHT),
+                (user.colors, COLOR_WEIGHT),
+                (user.themes, THEME_WEIGHT),
+            ):
+                for tid in taxonomy.keys(tags):
+                    weights[tid] = weights.get(tid, 0) + w
+
+            tag_score: Dict[str, int] = {}
+            for tid, w in weights.items():
+                for aid, n in self._tag_index.get(tid, {}).items():
+                    if aid in candidate_set:
+                        tag_score[aid] = tag_score.get(aid, 0) + w * n
+
+            scores = {}
+            for aid in candidates:
+                s = tag_score.get(aid, 0) + IN_BUDGET_BONUS
+                area = self._area[aid]
+                if user.space == "bedroom" and area <= SPACE_AREA_THRESHOLD:
+                    s += SPACE_BONUS
+                elif user.space == "living_room" and area >= SPACE_AREA_THRESHOLD:
+                    s += SPACE_BONUS
+                scores[aid] = s
+            return scores
+
+    def rank(self, user: UserProfile, k: Optional[int] = None):
+        """
+        Same output shape and order as rank_artworks over the catalog
+        (ties broken by first-insert order). With `k`, only the best k are
+        selected (heap, no full sort).
+        """
+        with self._lock:
+            scores = self.score_candidates(user)
+            sort_key = lambda aid: (-scores[aid], self._seq[aid])
+            if k is None:
+                ordered = sorted(scores, key=sort_key)
+            else:
+                ordered = heapq.nsmallest(max(k, 0), scores, key=sort_key)
+            return [{"artwork": self._artworks[aid], "score": scores[aid]} for aid in ordered]
+
+
+# Catalog used by the routes (shared by all workers through SQLite)
+catalog = ArtworkCatalog(Path(config.CATALOG_SQLITE_PATH) if config.CATALOG_SQLITE_PATH else None)
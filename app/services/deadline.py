@@ -0,0 +1,43 @@
+import asyncio
+from typing import Any, Awaitable, Dict, Optional, Set, Tuple
+
+# Strong references, so timed-out work is not garbage collected mid-flight
+_background_tasks: Set[asyncio.Task] = set()
+
+def _reap(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background AI task failed: {task.exception()}")
+
+def resolve_budget(options: Dict[str, Any], default: float) -> Optional[float]:
+    """
+    Budget for this request: options.budget_seconds if given, else the route
+    default. Returns None (no budget) for 0 / negative values.
+    """
+    raw = options.get("budget_seconds")
+    try:
+        budget = float(raw) if raw is not None else float(default)
+    except (TypeError, ValueError):
+        budget = float(default)
+    return budget if budget > 0 else None
+
+async def run_with_budget(work: Awaitable[Any], budget_seconds: Optional[float]) -> Tuple[bool, Any]:
+    """
+    Awaits `work` for at most budget_seconds.
+    - finished in time -> (True, result); its exceptions propagate
+    - budget exhausted -> (False, None); the work is NOT cancelled and keeps
+      running in the background, so its side effects (cache fills) still land
+    """
+    task = asyncio.ensure_future(work)
+    if budget_seconds is None:
+        return True, await task
+
+    try:
+        return True, await asyncio.wait_for(asyncio.shield(task), budget_seconds)
+    except asyncio.TimeoutError:
+        if task.done():
+            # the work itself raised TimeoutError
+            raise
+        _background_tasks.add(task)
+        task.add_done_callback(_reap)
+        return False, None
@@ -0,0 +1,50 @@
+import hashlib
+from typing import Any, Dict
+
+from app.models.artwork import Artwork, ArtworkRecord
+from app.models.user_profile import UserProfile
+
+def story_hash(story: str) -> str:
+    return hashlib.sha256((story or "").encode("utf-8")).hexdigest()
+
+def artwork_fingerprint(a: Artwork) -> Dict[str, Any]:
+    """
+    Essential art fields for cache keys: stable, but not huge.
+    """
+    return {
+        "id": a.id,
+        "price": a.price,
+        "currency": a.currency,
+        "year": a.year,
+        "size": {"w": a.size.width, "h": a.size.height, "u": a.size.unit},
+        "tags": sorted(a.tags),
+        # the prompts quote the story; hash all of it so any edit changes the key
+        "storyHash": story_hash(a.story)
+    }
+
+def record_fingerprint(r: ArtworkRecord) -> Dict[str, Any]:
+    """
+    artwork_fingerprint of r.artwork(), read straight from the record's fields.
+    """
+    f = r.fields
+    return {
+        "id": r.id,
+        "price": r.price,
+        "currency": f["currency"],
+        "year": f["year"],
+        "size": {"w": f["size"]["width"], "h": f["size"]["height"], "u": f["size"]["unit"]},
+        "tags": sorted(r.tags),
+        "storyHash": story_hash(f["story"])
+    }
+
+def artwork_detail_fingerprint(a: Artwork) -> Dict[str, Any]:
+    """
+    artwork_fingerprint + the display fields explain/compare prompts quote.
+    """
+    fp = artwork_fingerprint(a)
+    fp["title"] = a.title
+    fp["artistName"] = a.artistName
+    return fp
+
+def profile_fingerprint(user: UserProfile) -> Dict[str, Any]:
+    return user.model_dump()
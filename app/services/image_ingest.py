@@ -0,0 +1,171 @@
+import io
+import socket
+import base64
+import asyncio
+import binascii
+import ipaddress
+from typing import Any, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core import config
+
+_http = None  # process-wide httpx.AsyncClient for image downloads
+
+
+def get_image_client():
+    """
+    Pooled client for image downloads, so repeated fetches from the same
+    host reuse kept-alive connections.
+    """
+    global _http
+    if _http is None:
+        import httpx
+
+        _http = httpx.AsyncClient(
+            timeout=httpx.Timeout(config.IMAGE_FETCH_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=config.IMAGE_FETCH_MAX_CONNECTIONS,
+                max_keepalive_connections=config.IMAGE_FETCH_MAX_CONNECTIONS,
+            ),
+            # redirects are followed by hand so every hop is checked
+            follow_redirects=False,
+        )
+    return _http
+
+async def close_image_client() -> None:
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
+def _is_public(ip: str) -> bool:
+    addr = ipaddress.ip_address(ip.split("%", 1)[0])
+    if isinstance(addr, ipaddress.IPv6Address) and addr.ipv4_mapped is not None:
+        addr = addr.ipv4_mapped
+    return addr.is_global and not addr.is_multicast
+
+async def _resolve_public(url) -> str:
+    """
+    Resolves the URL's host and returns one address to connect to; refuses
+    hosts with any loopback / private / link-local / reserved address
+    (no fetching of 127.0.0.1, 169.254.169.254 or internal services).
+    """
+    if url.scheme not in ("http", "https") or not url.host:
+        raise ValueError("imageUrl must be http(s)")
+    port = url.port or (443 if url.scheme == "https" else 80)
+    infos = await asyncio.get_running_loop().getaddrinfo(url.host, port, type=socket.SOCK_STREAM)
+    addresses = [info[4][0] for info in infos]
+    if not addresses or not all(_is_public(ip) for ip in addresses):
+        raise ValueError("imageUrl must point to a public address")
+    return addresses[0]
+
+def _pinned_request(client, url, ip: str):
+    # Connect to the address that was checked (no second DNS lookup to
+    # rebind); Host header and TLS SNI / certificate check keep the name
+    extensions: Dict[str, Any] = {}
+    if url.scheme == "https":
+        extensions["sni_hostname"] = url.host
+    return client.build_request(
+        "GET", url.copy_with(host=ip),
+        headers={"Host": url.netloc.decode("ascii")},
+        extensions=extensions,
+    )
+
+async def fetch_image_bytes(image_url: str, max_bytes: int = 0) -> bytes:
+    """
+    Streams the image and gives up as soon as it exceeds max_bytes
+    (or when Content-Length already says it will).
+    """
+    import httpx
+
+    if not config.IMAGE_FETCH_ENABLED:
+        raise ValueError("imageUrl fetching is disabled")
+    max_bytes = max_bytes or config.IMAGE_MAX_BYTES
+    client = get_image_client()
+    url = httpx.URL(image_url)
+
+    for _ in range(config.IMAGE_FETCH_MAX_REDIRECTS + 1):
+        ip = await _resolve_public(url)
+        resp = await client.send(_pinned_request(client, url, ip), stream=True)
+        try:
+            if resp.is_redirect:
+                url = url.join(resp.headers["location"])
+                continue
+            resp.raise_for_status()
+            declared = resp.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                raise ValueError("Image too large")
+
+            buf = bytearray()
+            async for chunk in resp.aiter_bytes():
+                buf.extend(chunk)
+                if len(buf) > max_bytes:
+                    raise ValueError("Image too large")
+            return bytes(buf)
+        finally:
+            await resp.aclose()
+    raise ValueError("Too many redirects")
+
+def decode_base64_image(data: str, max_bytes: int = 0) -> bytes:
+    """
+    Accepts raw base64 or a data: URL.
+    """
+    max_bytes = max_bytes or config.IMAGE_MAX_BYTES
+    if data.startswith("data:"):
+        data = data.split(",", 1)[-1]
+    # 4 base64 chars encode 3 bytes; check before decoding anything
+    if len(data) * 3 // 4 > max_bytes:
+        raise ValueError("Image too large")
+    try:
+        return base64.b64decode(data, validate=False)
+    except (binascii.Error, ValueError):
+        raise ValueError("imageBase64 is not valid base64")
+
+def _dhash(raw: bytes) -> Dict[str, Any]:
+    """
+    Decodes, downscales to a fixed grayscale thumbnail and computes a 64-bit
+    difference hash (each bit: is a pixel brighter than its right neighbour).
+    Re-encodes, resizes and small edits keep most bits, so near-duplicates
+    are a small Hamming distance apart.
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(raw)) as img:
+        width, height = img.size
+        if width * height > config.IMAGE_MAX_PIXELS:
+            raise ValueError("Image has too many pixels")
+        # JPEG: let the decoder downscale while decoding
+        img.draft("L", (config.IMAGE_THUMBNAIL_SIZE, config.IMAGE_THUMBNAIL_SIZE))
+        thumb = img.convert("L")
+        thumb.thumbnail((config.IMAGE_THUMBNAIL_SIZE, config.IMAGE_THUMBNAIL_SIZE))
+        small = thumb.resize((9, 8), Image.Resampling.LANCZOS)
+
+    px = small.tobytes()
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (px[row * 9 + col] > px[row * 9 + col + 1])
+    return {"hash": f"{bits:016x}", "width": width, "height": height}
+
+def hamming_distance(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+async def ingest_image(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Image stage of tag suggestion: imageBase64 or imageUrl -> perceptual hash.
+    Returns { "hash": "<16 hex>", "width", "height" }, or None when no image
+    was given or it could not be read (tagging then uses text only).
+    """
+    try:
+        if payload.get("imageBase64"):
+            raw = decode_base64_image(payload["imageBase64"])
+        elif payload.get("imageUrl"):
+            raw = await fetch_image_bytes(payload["imageUrl"])
+        else:
+            return None
+        # decoding is CPU work; keep it off the event loop
+        return await run_in_threadpool(_dhash, raw)
+    except Exception as e:
+        print(f"Image ingestion Error: {e}")
+        return None
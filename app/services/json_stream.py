@@ -0,0 +1,215 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+_WS = " \t\r\n"
+
+# Pseudo-field emitted by feed() when fields already returned turn out to
+# belong to a false start: discard everything received before it. A unique
+# object (compare with `is`), so a model field named "reset" is just a field.
+RESET: Any = object()
+
+
+class StreamingJSONParser:
+    """
+    Single-pass, incremental parser for the JSON object in an LLM completion.
+    Feed it text as it streams in; each feed() returns the top-level
+    (key, value) pairs that just completed.
+
+    - skips <think>...</think> blocks and any prose / ```json fence before
+      the object; text after the closing brace is ignored
+    - `done` turns True as soon as the top-level object closes, so callers
+      can stop generation there
+    - with a pydantic `schema`, each field is validated against its
+      annotation as it completes; invalid fields are left out (see `errors`)
+      and unknown fields pass through unchanged
+    - if what looked like the object turns out not to be JSON
+      (e.g. "{the} JSON: {...}"), scanning restarts at the next '{'; if
+      fields of it were already returned, (RESET, None) is returned first
+    """
+
+    def __init__(self, schema: Optional[Type[BaseModel]] = None):
+        self.schema = schema
+        self._adapters: Dict[str, TypeAdapter] = {}
+        if schema is not None:
+            self._adapters = {
+                name: TypeAdapter(field.annotation) for name, field in schema.model_fields.items()
+            }
+        self.buf = ""
+        self.done = False
+        self._search_from = 0
+        self._restart_at(0)
+
+    def _restart_at(self, search_from: int) -> None:
+        self._search_from = search_from
+        self.start = -1
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.expect = "key"  # key | colon | value | in_value (top level only)
+        self.key_start = -1
+        self.key: Optional[str] = None
+        self.value_start = -1
+        self.fields: Dict[str, Any] = {}
+        self.errors: Dict[str, str] = {}
+
+    # ---- public API ----
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        self.buf += text
+        out: List[Tuple[str, Any]] = []
+        while not self.done:
+            if self.start == -1 and not self._find_start():
+                break
+            if not self._scan(out):
+                break
+        return out
+
+    def result(self) -> Dict[str, Any]:
+        if not self.done:
+            raise ValueError("Model did not return valid JSON")
+        return self.fields
+
+    # ---- internals ----
+
+    def _find_start(self) -> bool:
+        buf = self.buf
+        while True:
+            brace = buf.find("{", self._search_from)
+            think = buf.find(THINK_OPEN, self._search_from)
+            if think != -1 and (brace == -1 or think < brace):
+                end = buf.find(THINK_CLOSE, think)
+                if end == -1:
+                    return False  # still thinking
+                self._search_from = end + len(THINK_CLOSE)
+                continue
+            if brace == -1:
+                return False
+            self.start = brace
+            self.pos = brace + 1
+            self.depth = 1
+            return True
+
+    def _fail(self, out: List[Tuple[str, Any]]) -> bool:
+        # not a JSON object after all: try again from the next '{'
+        if self.fields:
+            out.append((RESET, None))
+        self._restart_at(self.start + 1)
+        return True
+
+    def _scan(self, out: List[Tuple[str, Any]]) -> bool:
+        """
+        Advances over buffered text. Returns False when more input is needed,
+        True when the caller should loop again (object done or restarted).
+        """
+        buf = self.buf
+        i = self.pos
+        n = len(buf)
+        while i < n:
+            ch = buf[i]
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.expect == "key":
+                        self.key = json.loads(buf[self.key_start:i + 1])
+                        self.expect = "colon"
+                i += 1
+                continue
+
+            if self.depth > 1:
+                if ch == '"':
+                    self.in_string = True
+                elif ch in "{[":
+                    self.depth += 1
+                elif ch in "}]":
+                    self.depth -= 1
+                i += 1
+                continue
+
+            # ---- top level of the object ----
+            if ch in _WS:
+                i += 1
+                continue
+
+            if self.expect == "key":
+                if ch == '"':
+                    self.in_string = True
+                    self.key_start = i
+                elif ch == "}":
+                    self.done = True
+                    self.pos = i + 1
+                    return True
+                else:
+                    return self._fail(out)
+            elif self.expect == "colon":
+                if ch != ":":
+                    return self._fail(out)
+                self.expect = "value"
+                self.value_start = i + 1
+            elif self.expect == "value":
+                self.expect = "in_value"
+                if ch == '"':
+                    self.in_string = True
+                elif ch in "{[":
+                    self.depth += 1
+                elif ch in "}],:":
+                    return self._fail(out)
+            else:  # in_value: scalar chars, or the end of a field
+                if ch in ",}":
+                    if not self._complete_field(buf[self.value_start:i], out):
+                        return self._fail(out)
+                    if ch == "}":
+                        self.done = True
+                        self.pos = i + 1
+                        return True
+                    self.expect = "key"
+                elif ch == '"':
+                    return self._fail(out)
+                elif ch in "{[":
+                    return self._fail(out)
+            i += 1
+
+        self.pos = i
+        return False
+
+    def _complete_field(self, raw: str, out: List[Tuple[str, Any]]) -> bool:
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            return False
+
+        key = self.key
+        self.key = None
+        self.key_start = -1
+        self.value_start = -1
+
+        adapter = self._adapters.get(key)
+        if adapter is not None:
+            try:
+                value = adapter.dump_python(adapter.validate_python(value), mode="json")
+            except ValidationError as e:
+                self.errors[key] = str(e)
+                return True
+
+        self.fields[key] = value
+        out.append((key, value))
+        return True
+
+
+def parse_json_object(text: str, schema: Optional[Type[BaseModel]] = None) -> Dict[str, Any]:
+    """
+    One-shot form of StreamingJSONParser for a finished completion.
+    Raises ValueError if no complete JSON object is found.
+    """
+    parser = StreamingJSONParser(schema)
+    parser.feed(text or "")
+    return parser.result()
@@ -0,0 +1,55 @@
+import json
+from typing import Any, AsyncIterator, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from starlette.responses import StreamingResponse
+
+from app.services.openai_client import JSON_SYSTEM_PROMPT, stream_chat_text
+from app.services.json_stream import StreamingJSONParser
+
+async def stream_llm_json_fields(prompt: str, temperature: float = 0.4,
+                                 schema: Optional[Type[BaseModel]] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streams a JSON-only completion and yields top-level fields as they close
+    (validated against `schema`'s field types when given; invalid fields
+    are skipped). (RESET, None) means the fields yielded so far came from a
+    false start and must be discarded. Stops reading (and closes the upstream stream) once the
+    object is complete. Raises ValueError if the stream ends before a
+    complete object.
+    """
+    scanner = StreamingJSONParser(schema)
+    chunks = stream_chat_text(
+        [
+            {"role": "system", "content": JSON_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=temperature,
+    )
+    try:
+        async for delta in chunks:
+            for field in scanner.feed(delta):
+                yield field
+            if scanner.done:
+                break
+    finally:
+        await chunks.aclose()
+
+    if not scanner.done:
+        raise ValueError("Model stream ended before a complete JSON object")
+
+
+# Incremental responses must reach the client as they are produced: no
+# caching, and no response buffering in nginx-style reverse proxies
+STREAMING_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """
+    Server-Sent Events response for a generator of sse_event() frames.
+    """
+    return StreamingResponse(events, media_type="text/event-stream", headers=STREAMING_HEADERS)
+
+def sse_event(event: str, data: Any) -> str:
+    """
+    One Server-Sent Events frame with a JSON payload.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -1,72 +1,295 @@
-import os, json
+import os
+import copy
+import asyncio
+import random
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Type, TypeVar
 from dotenv import load_dotenv
+from pydantic import BaseModel
+
+from app.core import config
+from app.services.cache import make_cache_key
+from app.services.singleflight import SingleFlight
+from app.services.json_stream import StreamingJSONParser, parse_json_object
 
 load_dotenv()
 
-def extract_json(text: str) -> dict:
+JSON_SYSTEM_PROMPT = "You must output STRICT JSON only. No extra text."
+
+_client = None  # process-wide AsyncOpenAI, created on first use
+
+# Identical prompts already in flight share one upstream call
+_llm_flight = SingleFlight()
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
     """
-    Hackathon-safe JSON extractor:
-    - expects the model to return JSON only
-    - if it returns extra text, attempts to slice the first {...} block
-    - handles markdown code blocks e.g. ```json ... ```
+    Raised instead of calling the provider while the circuit is open.
+    Routes treat it like any other AI failure and serve their fallbacks.
     """
-    text = text.strip()
-    
-    # Try direct parse
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
-
-    # Try regex for markdown code blocks
-    import re
-    match = re.search(r"```(?:json)?\s*(.*?)\s*```", text, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group(1))
-        except json.JSONDecodeError:
-            pass
-
-    # Try finding first { and last }
-    start = text.find("{")
-    end = text.rfind("}")
-    if start != -1 and end != -1 and end > start:
+
+
+class CircuitBreaker:
+    """
+    closed    -> calls go through; consecutive transient failures are counted
+    open      -> calls fail fast with CircuitOpenError for reset_seconds
+    half_open -> one probe call is let through; success closes the circuit,
+                 failure re-opens it
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def before_call(self) -> None:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                raise CircuitOpenError("LLM provider circuit is open")
+            self.state = "half_open"
+            self.probe_in_flight = False
+        if self.state == "half_open":
+            if self.probe_in_flight:
+                raise CircuitOpenError("LLM provider circuit is half-open (probe in flight)")
+            self.probe_in_flight = True
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            print("LLM circuit closed")
+        self.state = "closed"
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                print(f"LLM circuit opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def retry_after(self) -> float:
+        # seconds until an open circuit lets a probe through (0 otherwise)
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+
+_breaker = CircuitBreaker(config.LLM_BREAKER_FAILURE_THRESHOLD, config.LLM_BREAKER_RESET_SECONDS)
+
+def circuit_retry_after() -> float:
+    return _breaker.retry_after()
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Full-jitter exponential backoff before retry number `attempt` (0-based).
+    """
+    delay = min(config.LLM_RETRY_MAX_DELAY_SECONDS,
+                config.LLM_RETRY_BASE_DELAY_SECONDS * (2 ** attempt))
+    return random.uniform(0, delay)
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+def _is_transient(e: Exception) -> bool:
+    import httpx
+    import openai
+
+    if isinstance(e, (openai.APIConnectionError, httpx.TransportError)):
+        return True  # includes APITimeoutError
+    if isinstance(e, openai.APIStatusError):
+        return e.status_code in _RETRYABLE_STATUS
+    return False
+
+async def _with_resilience(fn: Callable[[], Awaitable[T]], record_success: bool = True) -> T:
+    """
+    Runs one provider call with bounded retries (full-jitter exponential
+    backoff) for transient errors, guarded by the shared circuit breaker.
+    Non-transient errors (bad request, auth, ...) are raised immediately.
+    record_success=False: the call only opens a stream; the caller reports
+    the outcome once it has read from it.
+    """
+    attempts = max(1, config.LLM_MAX_ATTEMPTS)
+    for attempt in range(attempts):
+        _breaker.before_call()
         try:
-            return json.loads(text[start:end+1])
-        except json.JSONDecodeError:
-            pass
+            result = await fn()
+        except asyncio.CancelledError:
+            # caller went away; don't leave a half-open probe slot taken
+            _breaker.probe_in_flight = False
+            raise
+        except Exception as e:
+            if not _is_transient(e):
+                # the provider answered; it is reachable
+                _breaker.record_success()
+                raise
+            _breaker.record_failure()
+            if attempt == attempts - 1:
+                raise
+            await asyncio.sleep(backoff_delay(attempt))
+        else:
+            if record_success:
+                _breaker.record_success()
+            return result
 
-    # Log the failure for debugging
-    print(f"FAILED TO PARSE JSON. Content received:\n{text}")
-    raise ValueError("Model did not return valid JSON")
+def extract_json(text: str, schema: Optional[Type[BaseModel]] = None) -> dict:
+    """
+    JSON extractor for a finished completion (see json_stream for the rules:
+    <think> blocks, prose and ```json fences around the object are skipped).
+    """
+    try:
+        return parse_json_object(text, schema)
+    except ValueError:
+        # Log the failure for debugging
+        print(f"FAILED TO PARSE JSON. Content received:\n{text}")
+        raise
 
-def call_llm_json(prompt: str) -> dict:
+def get_llm_client():
     """
-    Uses OpenAI Chat Completions for simplicity in hackathons.
+    Process-wide AsyncOpenAI client on one pooled httpx.AsyncClient, so every
+    LLM call reuses kept-alive connections instead of a new TLS handshake.
     NOTE: Keep it server-side only.
     """
-    from openai import OpenAI
-    
-    api_key = os.getenv("FEATHERLESS_API_KEY")
-    if not api_key:
-        raise RuntimeError("Missing FEATHERLESS_API_KEY in environment")
+    global _client
+    if _client is None:
+        import httpx
+        from openai import AsyncOpenAI
+
+        api_key = os.getenv("FEATHERLESS_API_KEY")
+        if not api_key:
+            raise RuntimeError("Missing FEATHERLESS_API_KEY in environment")
 
-    client = OpenAI(
-        base_url="https://api.featherless.ai/v1",
-        api_key=api_key
-    )
+        http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                config.LLM_READ_TIMEOUT_SECONDS,
+                connect=config.LLM_CONNECT_TIMEOUT_SECONDS,
+            ),
+            limits=httpx.Limits(
+                max_connections=config.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=config.LLM_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+        _client = AsyncOpenAI(
+            base_url=config.LLM_BASE_URL,
+            api_key=api_key,
+            http_client=http_client,
+            timeout=http_client.timeout,
+            max_retries=0,  # retries are handled by _with_resilience
+        )
+    return _client
 
+async def close_llm_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+async def complete_json(messages: List[Dict[str, Any]], temperature: float,
+                        schema: Optional[Type[BaseModel]] = None,
+                        model: Optional[str] = None) -> dict:
+    """
+    One JSON-only chat completion on the pooled client; returns the parsed
+    object. The completion is streamed through StreamingJSONParser and the
+    upstream stream is closed as soon as the object closes, so trailing text
+    is never generated. With a `schema`, fields are validated as they arrive.
+    Concurrent calls with the same model/messages/temperature/schema are
+    coalesced into a single upstream request, which gets the shared retry
+    policy and circuit breaker.
+    """
+    model = model or config.LLM_MODEL
+    key = make_cache_key("llm", {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "schema": schema.__name__ if schema else None,
+    })
+
+    async def _once() -> dict:
+        client = get_llm_client()
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+        )
+        parser = StreamingJSONParser(schema)
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parser.feed(chunk.choices[0].delta.content)
+                    if parser.done:
+                        break
+        finally:
+            await stream.close()
+        if not parser.done:
+            print(f"FAILED TO PARSE JSON. Content received:\n{parser.buf}")
+        return parser.result()
+
+    # a dropped stream is retried as a whole; nothing has been returned yet
+    result = await _llm_flight.do(key, lambda: _with_resilience(_once))
+    # coalesced callers share the parsed object; give each its own copy
+    return copy.deepcopy(result)
+
+async def stream_chat_text(messages: List[Dict[str, Any]], temperature: float,
+                           model: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Streaming chat completion; yields text deltas as they arrive.
+    Closing the generator early closes the upstream stream too.
+    Only opening the stream is retried (text may already have been yielded).
+    The circuit breaker hears about the stream itself: read timeouts and
+    dropped connections mid-stream are failures, text arriving is success.
+    """
+    client = get_llm_client()
+    stream = await _with_resilience(lambda: client.chat.completions.create(
+        model=model or config.LLM_MODEL,
+        messages=messages,
+        temperature=temperature,
+        stream=True,
+    ), record_success=False)
+    healthy = False
     try:
-        resp = client.chat.completions.create(
-            model="Qwen/Qwen3-0.6B",
-            messages=[
-                {"role": "system", "content": "You must output STRICT JSON only. No extra text."},
+        async for chunk in stream:
+            healthy = True
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        healthy = True
+    except Exception as e:
+        if _is_transient(e):
+            healthy = False
+            _breaker.record_failure()
+        else:
+            healthy = True  # the provider answered
+        raise
+    finally:
+        if healthy:
+            _breaker.record_success()
+        else:
+            # cancelled before any output: don't leave a half-open probe slot taken
+            _breaker.probe_in_flight = False
+        await stream.close()
+
+async def call_llm_json(prompt: str, schema: Optional[Type[BaseModel]] = None) -> dict:
+    """
+    Uses OpenAI Chat Completions for simplicity in hackathons.
+    """
+    try:
+        return await complete_json(
+            [
+                {"role": "system", "content": JSON_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
             temperature=0.4,
+            schema=schema,
         )
-        text = resp.choices[0].message.content
-        return extract_json(text)
+    except CircuitOpenError:
+        # expected during provider incidents; callers serve their fallbacks
+        raise
     except Exception as e:
         print(f"ERROR in call_llm_json: {e}")
         import traceback
@@ -0,0 +1,123 @@
+import re
+from typing import Any, List, Sequence, Tuple
+
+from app.models.artwork import Artwork
+from app.models.user_profile import UserProfile
+
+# Rough BPE-style token pieces: words (~4 chars per token), numbers, symbols
+_TOKEN_RE = re.compile(r"[^\W\d_]+|\d+|[^\w\s]")
+
+# Upper bound per story even when the budget allows more (old prompt used 220 chars)
+MAX_STORY_CHARS = 220
+
+def _piece_tokens(piece: str) -> int:
+    return max(1, (len(piece) + 3) // 4)
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (no tokenizer dependency); close enough to budget
+    prompts, errs slightly high for long words.
+    """
+    return sum(_piece_tokens(m.group()) for m in _TOKEN_RE.finditer(text or ""))
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cuts text after ~max_tokens tokens, at a piece boundary, marking the cut.
+    """
+    text = text or ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 1:
+        return ""
+    used = 0
+    for m in _TOKEN_RE.finditer(text):
+        used += _piece_tokens(m.group())
+        if used > max_tokens - 1:  # keep one token for the marker
+            return text[:m.start()].rstrip() + "…"
+    return text
+
+def build_prompt(instructions: str, *sections: Tuple[str, str]) -> str:
+    """
+    instructions, then one "Heading:" block per (heading, body) section.
+    The instructions go first and never change between calls, so the
+    provider can reuse its prefix cache; per-request data follows.
+    """
+    return "\n".join([instructions] + [f"{heading}:\n{body}\n" for heading, body in sections])
+
+def _cell(value: Any) -> str:
+    # keep one row per line and "|" as the only separator
+    return str(value).replace("|", "/").replace("\n", " ").strip()
+
+def _num(value: Any) -> str:
+    """
+    Exact number text: 1250000.0 -> "1250000", 123.456789 stays as is
+    (":g" would give "1.25e+06" and "123.457").
+    """
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def _size(a: Artwork) -> str:
+    return f"{_num(a.size.width)}×{_num(a.size.height)}{a.size.unit}"
+
+def profile_lines(user: UserProfile) -> str:
+    return "\n".join([
+        f"- style: {', '.join(user.style)}",
+        f"- mood: {', '.join(user.mood)}",
+        f"- colors: {', '.join(user.colors)}",
+        f"- themes: {', '.join(user.themes)}",
+        f"- budget: {_num(user.budget.min)} to {_num(user.budget.max)}",
+        f"- space: {user.space}",
+    ])
+
+def artwork_lines(a: Artwork, story_tokens: int) -> str:
+    return "\n".join([
+        f"- id: {a.id}",
+        f"- title: {a.title}",
+        f"- artist: {a.artistName}",
+        f"- year: {a.year}",
+        f"- price: {_num(a.price)} {a.currency}",
+        f"- size: {_size(a)}",
+        f"- tags: {', '.join(a.tags)}",
+        f"- story: {trim_to_tokens(a.story or '', story_tokens)}",
+    ])
+
+TABLE_HEADER = "id|title|artist|year|price|size|tags|story"
+
+def _fair_shares(lengths: Sequence[int], budget: int) -> List[int]:
+    """
+    Splits `budget` across items: short items keep their full length and
+    their unused share goes to the longer ones (water-filling).
+    """
+    shares = [0] * len(lengths)
+    left = max(0, budget)
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    for n, i in enumerate(order):
+        share = left // (len(order) - n)
+        shares[i] = min(lengths[i], share)
+        left -= shares[i]
+    return shares
+
+def candidate_table(candidates: Sequence[Artwork], token_budget: int) -> str:
+    """
+    Candidates as a compact "|" table (one header, one row per artwork)
+    instead of a list of dict reprs. Stories are trimmed adaptively so the
+    whole table stays within token_budget (estimated).
+    """
+    rows = [
+        [
+            _cell(a.id), _cell(a.title), _cell(a.artistName), str(a.year),
+            f"{_num(a.price)} {a.currency}", _size(a), _cell(",".join(a.tags)),
+        ]
+        for a in candidates
+    ]
+    stories = [_cell((a.story or "")[:MAX_STORY_CHARS]) for a in candidates]
+
+    # +1 per row for the "|" before the story column
+    fixed = estimate_tokens(TABLE_HEADER) + sum(estimate_tokens("|".join(r)) + 1 for r in rows)
+    shares = _fair_shares([estimate_tokens(s) for s in stories], token_budget - fixed)
+
+    lines = [TABLE_HEADER]
+    for row, story, share in zip(rows, stories, shares):
+        lines.append("|".join(row + [trim_to_tokens(story, share)]))
+    return "\n".join(lines)
@@ -1,18 +1,60 @@
-from typing import List
+import heapq
+from itertools import islice
+from typing import Iterable, Iterator, List
 from app.models.artwork import Artwork
 from app.models.user_profile import UserProfile
-from app.services.scoring import score_artwork
+from app.services.batch_scoring import CatalogColumns, score_catalog, ranked_rows
+
+SCORE_BATCH_SIZE = 2048
 
 def rank_artworks(artworks: List[Artwork], user: UserProfile):
-    ranked = []
-
-    for art in artworks:
-        s = score_artwork(art, user)
-        if s > 0:
-            ranked.append({
-                "artwork": art,
-                "score": s
-            })
-
-    ranked.sort(key=lambda x: x["score"], reverse=True)
-    return ranked
+    # Score the whole list in one batched pass (same results as score_artwork)
+    columns = CatalogColumns(artworks)
+    scores = score_catalog(columns, user)
+
+    return [
+        {"artwork": columns.artworks[i], "score": int(scores[i])}
+        for i in ranked_rows(scores)
+    ]
+
+def _batches(items: Iterable[Artwork], size: int) -> Iterator[List[Artwork]]:
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+def rank_top_k(artworks: Iterable[Artwork], user: UserProfile, k: int = 20,
+               batch_size: int = SCORE_BATCH_SIZE):
+    """
+    Same result as rank_artworks(list(artworks), user)[:k], but streaming:
+    - accepts any iterable/generator of artworks
+    - holds at most k candidates + one scoring batch in memory
+    - ties go to the artwork seen first
+    """
+    if k <= 0:
+        return []
+
+    # Min-heap of (score, -position, artwork); heap[0] is the current worst.
+    # (score, -position) is unique, so artworks themselves are never compared.
+    heap = []
+    offset = 0
+    for batch in _batches(artworks, batch_size):
+        columns = CatalogColumns(batch)
+        scores = score_catalog(columns, user)
+
+        # Only the batch's own top k can make it into the overall top k
+        for row in ranked_rows(scores)[:k]:
+            item = (int(scores[row]), -(offset + int(row)), columns.artworks[row])
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, item)
+            else:
+                # rows are best-first, nothing further in this batch fits
+                break
+        offset += len(batch)
+
+    heap.sort(key=lambda item: item[:2], reverse=True)
+    return [{"artwork": art, "score": score} for score, _, art in heap]
@@ -1,17 +1,25 @@
 from app.models.artwork import Artwork
 from app.models.user_profile import UserProfile
+from app.models.taxonomy import taxonomy
 
 def score_artwork(art: Artwork, user: UserProfile) -> int:
     score = 0
 
+    # Taxonomy ids (free-form tags: their normalized string)
+    style = taxonomy.keys(user.style)
+    mood = taxonomy.keys(user.mood)
+    colors = taxonomy.keys(user.colors)
+    themes = taxonomy.keys(user.themes)
+
     for tag in art.tags:
-        if tag in user.style:
+        tid = taxonomy.match_key(tag)
+        if tid in style:
             score += 4
-        if tag in user.mood:
+        if tid in mood:
             score += 3
-        if tag in user.colors:
+        if tid in colors:
             score += 2
-        if tag in user.themes:
+        if tid in themes:
             score += 2
 
     if art.price < user.budget.min or art.price > user.budget.max:
@@ -0,0 +1,39 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight task.
+    - the first caller starts the work, later callers await the same task
+    - every caller gets the same result (or the same exception)
+    - the key is released as soon as the task finishes, so nothing is cached
+    - shielded: a cancelled caller does not cancel the shared upstream call
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.started += 1
+
+            def _release(done: asyncio.Task, key: str = key) -> None:
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+
+            task.add_done_callback(_release)
+
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,97 @@
+import json
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterable
+
+from pydantic import ValidationError
+
+from app.core import config
+from app.models.tag_models import TagSuggestRequest
+from app.services.openai_client import CircuitOpenError, backoff_delay, circuit_retry_after
+from app.services.tag_suggester import suggest_tags
+
+
+async def iter_file_lines(lines: Iterable[str]) -> AsyncIterator[str]:
+    """
+    Adapts a file object / list of lines to the async input of suggest_tags_bulk.
+    """
+    for line in lines:
+        yield line
+
+async def _suggest_one(index: int, line: str, retries: int) -> Dict[str, Any]:
+    try:
+        raw = json.loads(line)
+        payload = TagSuggestRequest.model_validate(raw).model_dump()
+    except (ValueError, ValidationError) as e:
+        # a bad record never gets better; report it and move on
+        return {"index": index, "error": f"invalid record: {e}"}
+
+    out: Dict[str, Any] = {"index": index}
+    if isinstance(raw, dict) and "id" in raw:
+        out["id"] = raw["id"]
+
+    for attempt in range(retries + 1):
+        try:
+            out["result"] = await suggest_tags(payload)
+            return out
+        except CircuitOpenError as e:
+            # provider is down: sleep until the breaker lets a probe through
+            # instead of burning the record's retries in a few milliseconds
+            if attempt == retries:
+                out["error"] = str(e)
+                return out
+            await asyncio.sleep(circuit_retry_after() or config.LLM_BREAKER_RESET_SECONDS)
+        except ValueError as e:
+            # unparseable / invalid answer: asking again can help
+            if attempt == retries:
+                out["error"] = str(e) or type(e).__name__
+                return out
+            await asyncio.sleep(backoff_delay(attempt))
+        except Exception as e:
+            # provider errors were already retried by the LLM client
+            out["error"] = str(e) or type(e).__name__
+            return out
+    return out
+
+async def suggest_tags_bulk(lines: AsyncIterator[str], start: int = 0,
+                            concurrency: int = 0, retries: int = -1) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Tag suggestion over a JSONL stream of TagSuggestRequest records.
+    - yields one dict per record, in input order:
+        { "index": n, "id": <if given>, "result": TagSuggestResponse }
+      or { "index": n, "id": ..., "error": "..." } once retries are used up
+    - `concurrency` records are in flight at once; input is read only a
+      bounded window ahead of the output, so memory stays flat
+    - blank lines are skipped and do not count as records
+    - start: skip the first `start` records (resume after a checkpoint)
+    """
+    concurrency = max(1, min(concurrency or config.TAG_BULK_CONCURRENCY, config.TAG_BULK_MAX_CONCURRENCY))
+    retries = config.TAG_BULK_RETRIES if retries < 0 else retries
+    sem = asyncio.Semaphore(concurrency)
+    window: Deque[asyncio.Task] = deque()
+
+    async def one(index: int, line: str) -> Dict[str, Any]:
+        async with sem:
+            return await _suggest_one(index, line, retries)
+
+    try:
+        index = -1
+        async for line in lines:
+            if not line.strip():
+                continue
+            index += 1
+            if index < start:
+                continue
+            window.append(asyncio.ensure_future(one(index, line)))
+            # emit finished results in order; block reading when far ahead
+            while window and (window[0].done() or len(window) >= concurrency * 2):
+                yield await window.popleft()
+        while window:
+            yield await window.popleft()
+    finally:
+        # consumer went away: don't leave orphaned model calls running
+        for task in window:
+            task.cancel()
+
+def jsonl(record: Dict[str, Any]) -> str:
+    return json.dumps(record, ensure_ascii=False) + "\n"
@@ -0,0 +1,322 @@
+import re
+import json
+import zlib
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core import config
+from app.models.taxonomy import CATEGORIES
+
+# Words (or phrases) that name a tag without using its exact spelling.
+# Matched after stemming, so "waves" / "wave" and "calming" / "calm" are one entry.
+SYNONYMS: Dict[str, List[str]] = {
+    # style
+    "abstract": ["non-representational", "nonrepresentational", "non-figurative"],
+    "realistic": ["realism", "realist", "photorealistic", "lifelike", "naturalistic"],
+    "minimal": ["minimalist", "minimalism", "sparse", "pared back"],
+    "surreal": ["surrealism", "surrealist", "dreamlike", "uncanny"],
+    "expressionist": ["expressionism", "expressive", "gestural"],
+    "impressionist": ["impressionism", "impressionistic", "plein air"],
+    "pop-art": ["pop art", "warhol", "comic", "comic book"],
+    "geometric": ["geometry", "shapes", "grid", "triangles", "squares", "circles"],
+    # mood
+    "calm": ["serene", "serenity", "tranquil", "tranquility", "peaceful", "peace", "stillness", "soothing"],
+    "energetic": ["vibrant", "dynamic", "lively", "explosive", "vivid"],
+    "melancholic": ["melancholy", "sad", "sadness", "sorrow", "longing", "grief", "lonely", "loneliness", "somber"],
+    "joyful": ["joy", "happy", "happiness", "cheerful", "playful", "delight", "celebration"],
+    "mysterious": ["mystery", "enigmatic", "shadowy"],
+    "reflective": ["reflection", "contemplative", "contemplation", "introspective", "meditative", "meditation", "thoughtful", "pensive"],
+    # colors
+    "blue": ["azure", "navy", "cobalt", "cerulean", "indigo", "ultramarine", "sapphire", "turquoise"],
+    "red": ["crimson", "scarlet", "vermilion", "ruby", "maroon"],
+    "green": ["emerald", "olive", "jade", "verdant", "sage"],
+    "yellow": ["golden", "ochre", "amber", "mustard"],
+    "black": ["ebony", "jet black"],
+    "white": ["ivory", "cream"],
+    "monochrome": ["monochromatic", "black and white", "grayscale", "greyscale", "tonal"],
+    "pastel": ["pastels", "soft colors", "soft colours", "blush", "lavender", "mint"],
+    # themes
+    "nature": ["natural", "forest", "tree", "trees", "flower", "flowers", "garden", "botanical", "wildlife", "leaves", "mountain"],
+    "ocean": ["sea", "seascape", "wave", "waves", "beach", "coast", "coastal", "shore", "tide", "marine", "harbor", "harbour"],
+    "city": ["urban", "street", "streets", "skyline", "cityscape", "downtown", "metropolis", "buildings"],
+    "memory": ["memories", "remember", "remembering", "nostalgia", "nostalgic", "childhood", "recollection"],
+    "identity": ["selfhood", "heritage", "belonging", "who i am"],
+    "dream": ["dreams", "dreaming", "dreamscape", "reverie", "fantasy", "imagination"],
+    "portrait": ["face", "faces", "figure", "sitter", "self-portrait", "likeness"],
+    "landscape": ["landscapes", "horizon", "valley", "hills", "fields", "countryside", "vista"],
+    # space
+    "bedroom": ["bedside", "nursery"],
+    "living_room": ["living room", "lounge", "sitting room", "sofa", "couch"],
+    "study": ["library", "reading room", "desk"],
+    "office": ["workplace", "workspace", "boardroom", "reception", "corporate"],
+    "hallway": ["hall", "corridor", "entryway", "entrance", "foyer", "staircase"],
+}
+
+# Confidence of a lexicon hit, by where the term was found. A single
+# synonym stays below the default threshold (0.75): everyday words are too
+# ambiguous to skip the model on their own; two different ones agreeing are not.
+TITLE_TAG_CONFIDENCE = 0.95
+TEXT_TAG_CONFIDENCE = 0.9
+CORROBORATED_SYNONYM_CONFIDENCE = 0.8
+SYNONYM_CONFIDENCE = 0.6
+
+# "medium" says what the work is made of ("ink", "charcoal"), not its colours
+_MEDIUM_EXCLUDED = {"colors"}
+
+_WORD = re.compile(r"[a-z0-9]+")
+_SUFFIXES = ("ations", "ation", "ness", "ings", "ing", "edly", "ed", "ies", "ly", "s", "y")
+
+
+def stem(word: str) -> str:
+    """
+    Light suffix stripping; enough to merge plurals and -ing / -ed / -ly
+    forms ("waves" / "wave", "cities" / "city", "calming" / "calm").
+    """
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)]
+            break
+    if len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    # "runn" (running): collapse a doubled final consonant
+    if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "aeiouls":
+        word = word[:-1]
+    return word
+
+def stems(text: str) -> List[str]:
+    return [stem(w) for w in _WORD.findall((text or "").lower())]
+
+def _phrase(text: str) -> str:
+    return " " + " ".join(stems(text.replace("_", " ").replace("-", " "))) + " "
+
+# (category, tag, term, stemmed phrase) for every lexicon entry
+_LEXICON: List[Tuple[str, str, str, str]] = [
+    (category, tag, term, _phrase(term))
+    for category, tags in CATEGORIES.items()
+    for tag in tags
+    for term in [tag] + SYNONYMS.get(tag, [])
+]
+
+
+def _lexicon_scores(payload: Dict[str, Any]) -> Dict[Tuple[str, str], Tuple[float, str]]:
+    title = _phrase(payload.get("title") or "")
+    story = _phrase(str(payload.get("story") or ""))
+    with_medium = _phrase(" ".join(str(payload.get(k) or "") for k in ("story", "medium")))
+    scores: Dict[Tuple[str, str], Tuple[float, str]] = {}
+    synonyms: Dict[Tuple[str, str], List[str]] = {}
+    for category, tag, term, phrase in _LEXICON:
+        text = story if category in _MEDIUM_EXCLUDED else with_medium
+        if phrase not in title and phrase not in text:
+            continue
+        if term != tag:
+            synonyms.setdefault((category, tag), []).append(term)
+            continue
+        conf = TITLE_TAG_CONFIDENCE if phrase in title else TEXT_TAG_CONFIDENCE
+        scores[(category, tag)] = (conf, term)
+
+    # the tag's own name wins; otherwise synonyms, stronger when several agree
+    for key, terms in synonyms.items():
+        if key in scores:
+            continue
+        if len(terms) >= 2:
+            scores[key] = (CORROBORATED_SYNONYM_CONFIDENCE, " / ".join(terms[:2]))
+        else:
+            scores[key] = (SYNONYM_CONFIDENCE, terms[0])
+    return scores
+
+
+class _LinearModel:
+    """
+    Hashed TF-IDF + one-vs-rest logistic regression over accepted examples.
+    Words are hashed into TAG_CLASSIFIER_FEATURES buckets, so the feature
+    matrix is bounded by the example window, not by the vocabulary.
+    """
+
+    def __init__(self, idf: np.ndarray, labels: List[Tuple[str, str]], weights: np.ndarray, bias: np.ndarray):
+        self.idf = idf
+        self.labels = labels
+        self.weights = weights
+        self.bias = bias
+
+    @staticmethod
+    def _tf(tokens: List[str]) -> np.ndarray:
+        buckets = [zlib.crc32(t.encode("utf-8")) % config.TAG_CLASSIFIER_FEATURES for t in tokens]
+        return np.bincount(buckets, minlength=config.TAG_CLASSIFIER_FEATURES).astype(np.float32)
+
+    @classmethod
+    def train(cls, examples: List[Dict[str, Any]], min_positives: int) -> Optional["_LinearModel"]:
+        X = np.stack([cls._tf(stems(_example_text(e))) for e in examples])
+        n = len(examples)
+        idf = (np.log((1 + n) / (1 + np.count_nonzero(X, axis=0))) + 1.0).astype(np.float32)
+        X *= idf
+        X /= np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-9)
+
+        labels = []
+        columns = []
+        for category, tags in CATEGORIES.items():
+            for tag in tags:
+                y = np.array([1.0 if tag in (e.get(category) or []) else 0.0 for e in examples], dtype=np.float32)
+                if y.sum() >= min_positives:
+                    labels.append((category, tag))
+                    columns.append(y)
+        if not labels:
+            return None
+        Y = np.stack(columns, axis=1)
+
+        # Nesterov-accelerated gradient descent with a little L2 regularization
+        # (rows are unit length, so a step of 2 is safe)
+        W = np.zeros((X.shape[1], Y.shape[1]), dtype=np.float32)
+        b = np.zeros(Y.shape[1], dtype=np.float32)
+        W_prev, b_prev = W, b
+        for step in range(1, 81):
+            momentum = (step - 1) / (step + 2)
+            W_ahead = W + momentum * (W - W_prev)
+            b_ahead = b + momentum * (b - b_prev)
+            G = 1.0 / (1.0 + np.exp(-(X @ W_ahead + b_ahead))) - Y
+            W_prev, b_prev = W, b
+            W = W_ahead - 2.0 * (X.T @ G / n + 1e-3 * W_ahead)
+            b = b_ahead - 2.0 * G.mean(axis=0)
+        return cls(idf, labels, W, b)
+
+    def predict(self, payload: Dict[str, Any]) -> Dict[Tuple[str, str], float]:
+        x = self._tf(stems(_example_text(payload))) * self.idf
+        norm = np.linalg.norm(x)
+        if norm == 0:
+            return {}
+        p = 1.0 / (1.0 + np.exp(-((x / norm) @ self.weights + self.bias)))
+        return dict(zip(self.labels, p.tolist()))
+
+
+def _example_text(e: Dict[str, Any]) -> str:
+    return " ".join(str(e.get(k) or "") for k in ("title", "story", "medium"))
+
+
+class TagClassifier:
+    """
+    Offline first stage of tag suggestion (no network):
+    1. lexicon: tag names and synonyms found in title / story / medium
+    2. linear model trained from tags users accepted (record_accepted),
+       refit in a background thread as new examples arrive
+    Per tag the higher confidence wins. The overall confidence is the
+    weakest best tag among the required categories; below the threshold
+    the caller escalates to the LLM.
+    """
+
+    def __init__(self, examples_path: Path):
+        self.examples_path = examples_path
+        self.lock = threading.Lock()
+        self.model: Optional[_LinearModel] = None
+        self.examples: Optional[Deque[Dict[str, Any]]] = None
+        self.file_lines = 0
+        self.accepted = 0  # examples seen, including ones the window dropped
+        self.trained_on = -1
+        self.training = False
+
+    def _load_examples(self) -> Deque[Dict[str, Any]]:
+        # caller holds self.lock; only the newest MAX_EXAMPLES are kept
+        if self.examples is None:
+            self.examples = deque(maxlen=config.TAG_CLASSIFIER_MAX_EXAMPLES)
+            try:
+                with open(self.examples_path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            self.examples.append(json.loads(line))
+                            self.file_lines += 1
+            except FileNotFoundError:
+                pass
+            self.accepted = len(self.examples)
+        return self.examples
+
+    def _compact(self) -> None:
+        # caller holds self.lock; rewrites the file with just the window
+        tmp = self.examples_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for example in self.examples:
+                f.write(json.dumps(example, ensure_ascii=False) + "\n")
+        tmp.replace(self.examples_path)
+        self.file_lines = len(self.examples)
+
+    def record_accepted(self, example: Dict[str, Any]) -> int:
+        """
+        Stores one accepted (text fields + tags) example; returns how many
+        are kept for training.
+        """
+        with self.lock:
+            examples = self._load_examples()
+            self.examples_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.examples_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(example, ensure_ascii=False) + "\n")
+            examples.append(example)
+            self.accepted += 1
+            self.file_lines += 1
+            if self.file_lines >= 2 * config.TAG_CLASSIFIER_MAX_EXAMPLES:
+                self._compact()
+            return len(examples)
+
+    def _current_model(self) -> Optional[_LinearModel]:
+        """
+        The last trained model (None until the first fit finishes). Once
+        enough new examples have arrived, a background thread retrains and
+        swaps the result in; callers never wait for a fit.
+        """
+        with self.lock:
+            stale = self.trained_on < 0 or self.accepted - self.trained_on >= config.TAG_CLASSIFIER_RETRAIN_EVERY
+            if stale and not self.training:
+                self.training = True
+                threading.Thread(target=self._retrain, daemon=True).start()
+            return self.model
+
+    def _retrain(self) -> None:
+        try:
+            with self.lock:
+                examples = list(self._load_examples())
+                # a failed fit waits for the next batch of examples too
+                self.trained_on = self.accepted
+            model = _LinearModel.train(examples, config.TAG_CLASSIFIER_MIN_EXAMPLES) if examples else None
+            with self.lock:
+                self.model = model
+        except Exception as e:
+            print(f"Tag classifier training failed: {e}")
+        finally:
+            with self.lock:
+                self.training = False
+
+    def classify(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Returns { "tags": {category: [tag, ...]}, "confidence": 0..1,
+                  "evidence": {tag: "why"} }.
+        Only tags at or above the confidence threshold are listed.
+        """
+        threshold = config.TAG_CLASSIFIER_CONFIDENCE_THRESHOLD
+        lexicon = _lexicon_scores(payload)
+        scores = {key: conf for key, (conf, _) in lexicon.items()}
+        evidence = {tag: f'mentions "{term}"' for (_, tag), (_, term) in lexicon.items()}
+
+        model = self._current_model()
+        if model is not None:
+            for key, p in model.predict(payload).items():
+                if p > scores.get(key, 0.0):
+                    scores[key] = p
+                    evidence[key[1]] = f"similar to accepted examples ({p:.2f})"
+
+        tags: Dict[str, List[str]] = {category: [] for category in CATEGORIES}
+        best: Dict[str, float] = {category: 0.0 for category in CATEGORIES}
+        for (category, tag), conf in sorted(scores.items(), key=lambda kv: -kv[1]):
+            best[category] = max(best[category], conf)
+            if conf >= threshold:
+                tags[category].append(tag)
+
+        required = [c for c in config.TAG_CLASSIFIER_REQUIRED_CATEGORIES if c in CATEGORIES]
+        confidence = min((best[c] for c in required), default=0.0)
+        return {
+            "tags": tags,
+            "confidence": round(confidence, 4),
+            "evidence": {t: evidence[t] for ts in tags.values() for t in ts},
+        }
+
+
+tag_classifier = TagClassifier(Path(config.TAG_CLASSIFIER_EXAMPLES_PATH))
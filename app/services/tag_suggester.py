@@ -1,32 +1,107 @@
 import os, json
-import requests
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from starlette.concurrency import run_in_threadpool
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from app.models.tag_models import STYLE_TAGS, MOOD_TAGS, COLOR_TAGS, THEME_TAGS, SPACE_TAGS
-
-def _extract_json(text: str) -> dict:
-    text = text.strip()
-    if text.startswith("{") and text.endswith("}"):
-        return json.loads(text)
-    start = text.find("{")
-    end = text.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        return json.loads(text[start:end+1])
-    raise ValueError("Model did not return valid JSON")
-
-def _fetch_image_bytes(image_url: str, max_bytes: int = 8_000_000) -> bytes:
-    # Basic safety: size limit + timeout
-    resp = requests.get(image_url, timeout=10)
-    resp.raise_for_status()
-    data = resp.content
-    if len(data) > max_bytes:
-        raise ValueError("Image too large")
-    return data
-
-def suggest_tags_from_image(payload: Dict[str, Any]) -> Dict[str, Any]:
+from app.models.tag_models import STYLE_TAGS, MOOD_TAGS, COLOR_TAGS, THEME_TAGS, SPACE_TAGS, TagSuggestResponse
+from app.services.openai_client import complete_json
+from app.services.cache import make_cache_key, cache_get, cache_set
+from app.services.image_ingest import hamming_distance, ingest_image
+from app.services.tag_classifier import tag_classifier
+from app.models.taxonomy import taxonomy
+from app.core import config
+
+def filter_tags(generated_list, category: str):
+    if not isinstance(generated_list, list):
+        return []
+    # Registry lookup (case, separators, aliases); returns the official spelling
+    valid = []
+    for item in generated_list:
+        tag = taxonomy.in_category(item, category) if isinstance(item, str) else None
+        if tag is not None:
+            valid.append(tag)
+    return valid
+
+TAG_INDEX_MAX_IMAGES = 32  # image hashes remembered per set of text fields
+
+def _text_fingerprint(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "title": payload.get("title", ""),
+        "story": payload.get("story", "") or "",
+        "medium": payload.get("medium"),
+        "year": payload.get("year"),
+        "size": payload.get("size") or {},
+    }
+
+def _tags_key(text_fp: Dict[str, Any], image_hash: Optional[str]) -> str:
+    return make_cache_key("tags", {"text": text_fp, "image": image_hash})
+
+def _cached_tags(text_fp: Dict[str, Any], image: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Exact hit on (text fields, image hash), else the closest previously
+    tagged image with the same text fields within IMAGE_HASH_MAX_DISTANCE.
+    """
+    image_hash = image["hash"] if image else None
+    cached = cache_get(_tags_key(text_fp, image_hash))
+    if cached or image_hash is None:
+        return cached
+
+    index = cache_get(make_cache_key("tags_index", text_fp)) or {}
+    near = [
+        (hamming_distance(image_hash, h), h) for h in index.get("hashes", [])
+    ]
+    near = [item for item in near if item[0] <= config.IMAGE_HASH_MAX_DISTANCE]
+    for _, h in sorted(near):
+        cached = cache_get(_tags_key(text_fp, h))
+        if cached:
+            return cached
+    return None
+
+def _store_tags(text_fp: Dict[str, Any], image: Optional[Dict[str, Any]], result: Dict[str, Any]) -> None:
+    image_hash = image["hash"] if image else None
+    cache_set(_tags_key(text_fp, image_hash), result)
+    if image_hash is None:
+        return
+    index_key = make_cache_key("tags_index", text_fp)
+    hashes = (cache_get(index_key) or {}).get("hashes", [])
+    if image_hash not in hashes:
+        hashes = (hashes + [image_hash])[-TAG_INDEX_MAX_IMAGES:]
+        cache_set(index_key, {"hashes": hashes})
+
+async def suggest_tags_from_image(payload: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        return await suggest_tags(payload)
+    except Exception as e:
+        print(f"Tag Suggestion Error: {e}")
+        return {
+            "style": [], "mood": [], "colors": [], "themes": [], "space": [],
+            "explanation": "Could not generate tags (AI Error)."
+        }
+
+async def suggest_tags(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    suggest_tags_from_image without the fallback: model / parsing errors
+    are raised, so callers such as the bulk pipeline can retry.
+    """
+    # Re-uploads (and near-duplicate images) with the same text skip the model
+    image = await ingest_image(payload)
+    text_fp = _text_fingerprint(payload)
+    cached = _cached_tags(text_fp, image)
+    if cached:
+        return cached
+
+    # Offline classifier first; only uncertain cases go to the model
+    local = await run_in_threadpool(tag_classifier.classify, payload)
+    if local["confidence"] >= config.TAG_CLASSIFIER_CONFIDENCE_THRESHOLD:
+        result = dict(local["tags"])
+        result["explanation"] = "Matched locally: " + "; ".join(
+            f"{tag} ({why})" for tag, why in local["evidence"].items()
+        )
+        _store_tags(text_fp, image, result)
+        return result
+
     api_key = os.getenv("FEATHERLESS_API_KEY")
     if not api_key:
         raise RuntimeError("Missing FEATHERLESS_API_KEY")
@@ -76,50 +151,41 @@ Return STRICT JSON:
 }}
 """
 
-    # Featherless client
-    from openai import OpenAI
-    client = OpenAI(
-        base_url="https://api.featherless.ai/v1",
-        api_key=api_key
+    # Shared pooled Featherless client
+    # Streamed and parsed as it arrives; mistyped fields are dropped here
+    result = await complete_json(
+        [
+            {"role": "system", "content": "You are a strict data classifier. Output valid JSON."},
+            {"role": "user", "content": prompt_text}
+        ],
+        temperature=0.1,  # Lower temperature for stricter adherence
+        schema=TagSuggestResponse,
     )
 
-    try:
-        resp = client.chat.completions.create(
-            model="Qwen/Qwen3-0.6B",
-            messages=[
-                {"role": "system", "content": "You are a strict data classifier. Output valid JSON."},
-                {"role": "user", "content": prompt_text}
-            ],
-            temperature=0.1,  # Lower temperature for stricter adherence
-        )
-        out_text = resp.choices[0].message.content
-        result = _extract_json(out_text)
-    except Exception as e:
-        print(f"Tag Suggestion Error: {e}")
-        return {
-            "style": [], "mood": [], "colors": [], "themes": [], "space": [],
-            "explanation": "Could not generate tags (AI Error)."
-        }
-
     # STRICT VALIDATION: Filter out any hallucinated tags
-    def filter_tags(generated_list, allowed_list):
-        if not isinstance(generated_list, list):
-            return []
-        # Case-insensitive match, return the official casing
-        allowed_lower = {t.lower(): t for t in allowed_list}
-        valid = []
-        for item in generated_list:
-            if isinstance(item, str) and item.lower() in allowed_lower:
-                valid.append(allowed_lower[item.lower()])
-        return valid
-
-    result["style"] = filter_tags(result.get("style"), STYLE_TAGS)
-    result["mood"] = filter_tags(result.get("mood"), MOOD_TAGS)
-    result["colors"] = filter_tags(result.get("colors"), COLOR_TAGS)
-    result["themes"] = filter_tags(result.get("themes"), THEME_TAGS)
-    result["space"] = filter_tags(result.get("space"), SPACE_TAGS)
+    result["style"] = filter_tags(result.get("style"), "style")
+    result["mood"] = filter_tags(result.get("mood"), "mood")
+    result["colors"] = filter_tags(result.get("colors"), "colors")
+    result["themes"] = filter_tags(result.get("themes"), "themes")
+    result["space"] = filter_tags(result.get("space"), "space")
 
     if "explanation" not in result:
         result["explanation"] = "Mapped to database standards."
 
+    _store_tags(text_fp, image, result)
     return result
+
+def accept_tags(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Records tags a user accepted (after editing) as a training example for
+    the local classifier. Tags outside the taxonomy are dropped.
+    """
+    example = _text_fingerprint(payload)
+    example["style"] = filter_tags(payload.get("style"), "style")
+    example["mood"] = filter_tags(payload.get("mood"), "mood")
+    example["colors"] = filter_tags(payload.get("colors"), "colors")
+    example["themes"] = filter_tags(payload.get("themes"), "themes")
+    example["space"] = filter_tags(payload.get("space"), "space")
+    count = tag_classifier.record_accepted(example)
+    return {"accepted": {k: example[k] for k in ("style", "mood", "colors", "themes", "space")},
+            "examples": count}
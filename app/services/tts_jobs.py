@@ -0,0 +1,125 @@
+import asyncio
+import re
+import time
+from typing import Any, Dict, Optional, Set
+
+from app.core import config
+from app.services.tts_service import (
+    is_synthesized,
+    resolve_tts_request,
+    synthesize_story_to_mp3,
+    tts_rel_path,
+)
+
+
+class TTSJob:
+    """
+    One background synthesis. The job id is the tts_service cache key, so
+    the same text/voice/speed always maps to the same job and audio URL.
+    status: pending -> running -> done | failed
+    """
+
+    def __init__(self, job_id: str, text: str, voice: str, speed: float):
+        self.id = job_id
+        self.text = text
+        self.voice = voice
+        self.speed = speed
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.finished = asyncio.Event()
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self.finished.set()
+
+    def handle(self) -> Dict[str, Any]:
+        return {
+            "jobId": self.id,
+            "status": self.status,
+            # deterministic: valid as soon as status is "done"
+            "audioUrl": f"/static/{tts_rel_path(self.id)}",
+            "statusUrl": f"/tts/jobs/{self.id}",
+            "error": self.error,
+        }
+
+
+_JOB_ID = re.compile(r"[0-9a-f]{64}")
+
+_jobs: Dict[str, TTSJob] = {}
+_slots = asyncio.Semaphore(max(1, config.TTS_JOB_CONCURRENCY))
+# Strong references, so queued jobs are not garbage collected
+_tasks: Set[asyncio.Task] = set()
+
+def _prune() -> None:
+    cutoff = time.time() - config.TTS_JOB_RETENTION_SECONDS
+    for job_id in [j.id for j in _jobs.values() if j.finished_at and j.finished_at < cutoff]:
+        del _jobs[job_id]
+
+async def _run(job: TTSJob) -> None:
+    async with _slots:
+        job.status = "running"
+        try:
+            await synthesize_story_to_mp3(job.text, voice=job.voice, speed=job.speed)
+            job.finish("done")
+        except Exception as e:
+            print(f"TTS job {job.id} failed: {e}")
+            job.finish("failed", str(e))
+
+def submit_tts_job(text: str, voice: str = "alloy", speed: float = 1.0) -> Dict[str, Any]:
+    """
+    Queues synthesis in the background and returns its handle immediately.
+    - already on disk -> a "done" handle, nothing queued
+    - same key pending / running / done -> the existing job (deduped)
+    - a failed job is retried on the next submit
+    Must be called from the event loop. Raises ValueError for empty text.
+    """
+    text, voice, key = resolve_tts_request(text, voice, speed)
+    _prune()
+
+    job = _jobs.get(key)
+    if job is not None and job.status != "failed":
+        return job.handle()
+
+    job = TTSJob(key, text, voice, speed)
+    _jobs[key] = job
+    if is_synthesized(key):
+        job.finish("done")
+        return job.handle()
+
+    task = asyncio.get_running_loop().create_task(_run(job))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job.handle()
+
+def get_tts_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Current handle for a job id, or None if unknown. Audio that is already
+    on disk reports "done" even after its job record has been pruned.
+    """
+    if not _JOB_ID.fullmatch(job_id or ""):
+        return None
+    job = _jobs.get(job_id)
+    if job is not None:
+        return job.handle()
+    if is_synthesized(job_id):
+        done = TTSJob(job_id, "", "", 1.0)
+        done.finish("done")
+        return done.handle()
+    return None
+
+async def wait_tts_job(job_id: str, timeout_seconds: float) -> Optional[Dict[str, Any]]:
+    """
+    Long-poll form of get_tts_job: waits up to timeout_seconds for the job
+    to finish, then returns its handle.
+    """
+    job = _jobs.get(job_id)
+    if job is not None and timeout_seconds > 0:
+        try:
+            await asyncio.wait_for(job.finished.wait(), timeout_seconds)
+        except asyncio.TimeoutError:
+            pass
+    return get_tts_job(job_id)
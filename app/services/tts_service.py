@@ -1,58 +1,184 @@
 import os
+import re
+import atexit
+import asyncio
 import hashlib
+from contextlib import aclosing
 from pathlib import Path
+from typing import AsyncIterator, List, Tuple
 from dotenv import load_dotenv
 
+from app.core import config
+from app.services.audio_store import AudioStore
+
 load_dotenv()
 
 CACHE_DIR = Path("app/static/tts")
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
+# Per-sentence audio, shared by every story that contains the sentence
+SEGMENT_DIR = CACHE_DIR / "segments"
+SEGMENT_DIR.mkdir(parents=True, exist_ok=True)
+
+# Every file under CACHE_DIR goes through the store (quota, atomic writes)
+audio_store = AudioStore(
+    CACHE_DIR,
+    Path(config.TTS_STORE_INDEX_PATH),
+    config.TTS_STORE_MAX_BYTES,
+    index_flush_seconds=config.TTS_STORE_INDEX_FLUSH_SECONDS,
+)
+atexit.register(audio_store.flush)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n\s*\n")
+_CLAUSE_BREAK = re.compile(r"(?<=[,;:])\s+")
+_WORD_BREAK = re.compile(r"\s+")
+
 def _cache_key(text: str, voice: str, model: str, speed: float) -> str:
     raw = f"{model}|{voice}|{speed}|{text}".encode("utf-8")
     return hashlib.sha256(raw).hexdigest()
 
-async def synthesize_story_to_mp3(text: str, voice: str = "en-US-AriaNeural", speed: float = 1.0) -> str:
+TTS_MODEL = "edge-tts"
+
+def resolve_tts_request(text: str, voice: str, speed: float) -> Tuple[str, str, str]:
     """
-    Generates (or reuses cached) MP3 for the given text using edge-tts.
-    Returns relative path under /static, e.g. 'tts/<hash>.mp3'
+    Normalizes text/voice the way synthesis does.
+    Returns (text, voice, cache key); the key names the output file.
     """
     text = (text or "").strip()
     if not text:
         raise ValueError("text is empty")
 
-    # keep it short for hackathon reliability
-    if len(text) > 1500:
-        text = text[:1500] + "..."
-
     # Use a high-quality neural voice by default if 'alloy' (OpenAI) was passed
     if voice == "alloy" or not voice:
         voice = "en-US-AriaNeural"  # Calming female voice
 
-    model = "edge-tts"
-    key = _cache_key(text, voice, model, speed)
-    filename = f"{key}.mp3"
-    mp3_path = CACHE_DIR / filename
+    return text, voice, _cache_key(text, voice, TTS_MODEL, speed)
+
+def tts_rel_path(key: str) -> str:
+    """
+    Relative path under /static for a cache key, e.g. 'tts/<hash>.mp3'.
+    """
+    return f"tts/{key}.mp3"
+
+def is_synthesized(key: str) -> bool:
+    return audio_store.has(f"{key}.mp3")
+
+def _last_break(pattern: "re.Pattern", text: str, lo: int, hi: int) -> int:
+    cut = 0
+    for m in pattern.finditer(text, lo, hi + 1):
+        cut = m.start()
+    return cut
+
+def split_segments(text: str, max_chars: int = 0) -> List[str]:
+    """
+    Splits text into sentences (and paragraphs). Sentences longer than
+    max_chars are split further at commas, then at whitespace.
+    """
+    max_chars = max_chars or config.TTS_SEGMENT_MAX_CHARS
+    segments = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = " ".join(sentence.split())
+        while len(sentence) > max_chars:
+            cut = _last_break(_CLAUSE_BREAK, sentence, max_chars // 2, max_chars)
+            if cut <= 0:
+                cut = _last_break(_WORD_BREAK, sentence, 1, max_chars) or max_chars
+            segments.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            segments.append(sentence)
+    return segments
+
+def _rate_str(speed: float) -> str:
+    # edge-tts speed format is like "+0%" or "-10%"
+    # We'll approximate: 1.0 -> "+0%", 1.2 -> "+20%", 0.8 -> "-20%"
+    rate_str = "+0%"
+    if speed != 1.0:
+        pct = int((speed - 1.0) * 100)
+        sign = "+" if pct >= 0 else "-"
+        rate_str = f"{sign}{abs(pct)}%"
+    return rate_str
+
+def _segment_name(text: str, voice: str, speed: float) -> str:
+    return f"segments/{_cache_key(text, voice, TTS_MODEL, speed)}.mp3"
+
+async def _synthesize_segment(text: str, voice: str, speed: float) -> bytes:
+    """
+    One segment, cached under its own _cache_key in SEGMENT_DIR.
+    """
+    async def produce(tmp: Path) -> None:
+        import edge_tts
+        communicate = edge_tts.Communicate(text, voice, rate=_rate_str(speed))
+        await communicate.save(str(tmp))
+
+    return await audio_store.get_or_create(_segment_name(text, voice, speed), produce)
+
+async def synthesize_story_to_mp3(text: str, voice: str = "en-US-AriaNeural", speed: float = 1.0) -> str:
+    """
+    Generates (or reuses cached) MP3 for the given text using edge-tts.
+    The text is split into sentence segments that are synthesized
+    concurrently (TTS_SEGMENT_CONCURRENCY at a time) and cached one by one,
+    then concatenated; MP3 frames can simply be appended.
+    Returns relative path under /static, e.g. 'tts/<hash>.mp3'
+    """
+    text, voice, key = resolve_tts_request(text, voice, speed)
 
     # cache hit
-    if mp3_path.exists() and mp3_path.stat().st_size > 0:
-        return f"tts/{filename}"
+    if is_synthesized(key):
+        return tts_rel_path(key)
+
+    sem = asyncio.Semaphore(max(1, config.TTS_SEGMENT_CONCURRENCY))
+
+    async def one(segment: str) -> bytes:
+        async with sem:
+            return await _synthesize_segment(segment, voice, speed)
+
+    async def produce(tmp: Path) -> None:
+        segments = split_segments(text)
+        unique = list(dict.fromkeys(segments))  # repeated sentences: synthesize once
+        audio = dict(zip(unique, await asyncio.gather(*(one(seg) for seg in unique))))
+        tmp.write_bytes(b"".join(audio[seg] for seg in segments))
 
     try:
-        import edge_tts
-        # edge-tts speed format is like "+0%" or "-10%"
-        # We'll approximate: 1.0 -> "+0%", 1.2 -> "+20%", 0.8 -> "-20%"
-        rate_str = "+0%"
-        if speed != 1.0:
-            pct = int((speed - 1.0) * 100)
-            sign = "+" if pct >= 0 else "-"
-            rate_str = f"{sign}{abs(pct)}%"
-        
-        communicate = edge_tts.Communicate(text, voice, rate=rate_str)
-        await communicate.save(str(mp3_path))
-        
+        await audio_store.get_or_create(f"{key}.mp3", produce)
     except Exception as e:
         print(f"edge-tts Error: {e}")
         raise
 
-    return f"tts/{filename}"
+    return tts_rel_path(key)
+
+async def _edge_tts_chunks(text: str, voice: str, speed: float) -> AsyncIterator[bytes]:
+    import edge_tts
+    async for chunk in edge_tts.Communicate(text, voice, rate=_rate_str(speed)).stream():
+        if chunk["type"] == "audio":
+            yield chunk["data"]
+
+def _stream_segment(text: str, voice: str, speed: float) -> AsyncIterator[bytes]:
+    """
+    Audio chunks for one segment: from its cache file, or from edge-tts as
+    it produces them (published to the cache when done).
+    """
+    return audio_store.stream(_segment_name(text, voice, speed),
+                              lambda: _edge_tts_chunks(text, voice, speed))
+
+async def _story_chunks(text: str, voice: str, speed: float) -> AsyncIterator[bytes]:
+    for segment in split_segments(text):
+        async with aclosing(_stream_segment(segment, voice, speed)) as chunks:
+            async for data in chunks:
+                yield data
+
+async def stream_story_mp3(text: str, voice: str = "en-US-AriaNeural", speed: float = 1.0) -> AsyncIterator[bytes]:
+    """
+    Streaming form of synthesize_story_to_mp3: yields MP3 chunks as edge-tts
+    produces them, segment by segment. One producer per story (and per
+    segment) tees into the cache file, published atomically once complete;
+    concurrent listeners of the same story follow that producer, and none of
+    them holds a lock while the client reads.
+    """
+    text, voice, key = resolve_tts_request(text, voice, speed)
+    try:
+        async with aclosing(audio_store.stream(f"{key}.mp3", lambda: _story_chunks(text, voice, speed))) as chunks:
+            async for data in chunks:
+                yield data
+    except Exception as e:
+        print(f"edge-tts stream Error: {e}")
+        raise
@@ -0,0 +1,67 @@
+"""
+Ranking benchmark: per-artwork score_artwork loop (the original
+rank_artworks) vs the columnar engine, on a synthetic catalog.
+
+    python -m tests.bench_ranking [n_artworks]
+"""
+import sys
+import time
+import random
+from typing import Callable, List
+
+from app.models.artwork import Artwork
+from app.models.tag_models import STYLE_TAGS, MOOD_TAGS, COLOR_TAGS, THEME_TAGS
+from app.models.user_profile import UserProfile
+from app.services.batch_scoring import CatalogColumns, score_catalog
+from app.services.recommendation import rank_artworks, rank_top_k
+from app.services.scoring import score_artwork
+
+TAG_POOL = STYLE_TAGS + MOOD_TAGS + COLOR_TAGS + THEME_TAGS + ["sunset", "sci-fi", "Blue", "Minimalist"]
+
+
+def make_artworks(n: int, seed: int = 0) -> List[Artwork]:
+    rng = random.Random(seed)
+    return [
+        Artwork(
+            id=str(i), title="t", artistName="a", year=2000, price=rng.randint(50, 500), currency="SGD",
+            size={"width": rng.randint(20, 120), "height": rng.randint(20, 120), "unit": "cm"},
+            tags=rng.sample(TAG_POOL, k=5), story="s", imageUrl="", audioStoryUrl="",
+        )
+        for i in range(n)
+    ]
+
+def loop_rank(artworks: List[Artwork], user: UserProfile):
+    # rank_artworks before the columnar engine
+    ranked = [{"artwork": a, "score": score_artwork(a, user)} for a in artworks]
+    ranked = [r for r in ranked if r["score"] > 0]
+    ranked.sort(key=lambda r: r["score"], reverse=True)
+    return ranked
+
+def best_ms(fn: Callable[[], object], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(n: int) -> None:
+    artworks = make_artworks(n)
+    user = UserProfile(style=["abstract"], mood=["calm"], colors=["blue"], themes=["ocean"],
+                       budget={"min": 0, "max": 300}, space="bedroom")
+    columns = CatalogColumns(artworks)
+    rows = [
+        ("score_artwork loop", best_ms(lambda: loop_rank(artworks, user))),
+        ("rank_artworks", best_ms(lambda: rank_artworks(artworks, user))),
+        ("rank_top_k(k=20)", best_ms(lambda: rank_top_k(artworks, user, 20))),
+        ("  column build", best_ms(lambda: CatalogColumns(artworks))),
+        ("  score_catalog", best_ms(lambda: score_catalog(columns, user))),
+    ]
+    print(f"{n} artworks")
+    for name, ms in rows:
+        print(f"{name:<22}{ms:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30_000)
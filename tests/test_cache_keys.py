@@ -0,0 +1,47 @@
+"""
+Cache keys are built with orjson but must stay byte-identical to the
+json.dumps keys already on disk.
+"""
+import hashlib
+import json
+import random
+import string
+
+from app.services.cache import _stable_json, make_cache_key
+
+CHARS = string.printable + "é漢😀\x00\x01\x1f\x7f \"\\/"
+
+
+def reference(obj) -> str:
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+def random_value(rng: random.Random, depth: int = 0):
+    r = rng.random()
+    if depth > 3 or r < 0.3:
+        return rng.choice([
+            rng.uniform(-1e20, 1e20), rng.random() * 10 ** rng.randint(-30, 30),
+            rng.randint(-2 ** 63, 2 ** 63 - 1), 2 ** 70, 0.1, 1e-5, 123.0,
+            float("nan"), float("inf"), None, True, False,
+            "".join(rng.choices(CHARS, k=rng.randint(0, 12))),
+        ])
+    if r < 0.6:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {"".join(rng.choices(CHARS, k=rng.randint(0, 5))): random_value(rng, depth + 1)
+            for _ in range(rng.randint(0, 5))}
+
+
+def test_stable_json_matches_json_dumps():
+    rng = random.Random(0)
+    for _ in range(5000):
+        obj = random_value(rng)
+        assert _stable_json(obj) == reference(obj)
+
+def test_stable_json_non_str_keys():
+    assert _stable_json({"b": 1, "a": [1.0, 1e16, 1e-7]}) == reference({"b": 1, "a": [1.0, 1e16, 1e-7]})
+    assert _stable_json({1: 2}) == reference({1: 2})
+
+def test_make_cache_key_matches_json_dumps_key():
+    payload = {"userProfile": {"style": ["abstract"], "budget": {"min": 0, "max": 300.5}},
+               "artFingerprint": [{"id": "1", "tags": ["blue", "漢"], "price": 1e-5}]}
+    raw = ("recommend|" + reference(payload)).encode("utf-8")
+    assert make_cache_key("recommend", payload) == "recommend_" + hashlib.sha256(raw).hexdigest()
@@ -0,0 +1,48 @@
+"""
+The SQLite-backed catalog is shared: a second instance on the same file
+(another worker, or the next process) sees the same artworks, order and
+revision as the one that wrote them.
+"""
+from app.models.artwork import Artwork
+from app.models.user_profile import UserProfile
+from app.services.catalog import ArtworkCatalog
+
+
+def make_artwork(aid: str, price: float, tags) -> Artwork:
+    return Artwork(
+        id=aid, title="t", artistName="a", year=2000, price=price, currency="SGD",
+        size={"width": 50, "height": 40, "unit": "cm"}, tags=tags, story="s",
+        imageUrl="", audioStoryUrl="",
+    )
+
+USER = UserProfile(style=["abstract"], mood=["calm"], colors=["blue"], themes=["ocean"],
+                   budget={"min": 0, "max": 500}, space="bedroom")
+
+def ranking(catalog: ArtworkCatalog):
+    return [(r["artwork"].id, r["score"]) for r in catalog.rank(USER)]
+
+
+def test_catalog_is_shared_through_sqlite(tmp_path):
+    path = tmp_path / "catalog.sqlite3"
+    first, second = ArtworkCatalog(path), ArtworkCatalog(path)
+
+    first.upsert([make_artwork("1", 100, ["blue"]), make_artwork("2", 200, ["ocean", "calm"])])
+    assert len(second) == 2
+    assert ranking(second) == ranking(first)
+    assert second.revision == first.revision
+
+    second.upsert([make_artwork("1", 100, ["blue", "calm", "ocean"])])
+    second.delete("2")
+    assert ranking(first) == [("1", ranking(second)[0][1])]
+    assert first.revision == second.revision
+
+def test_catalog_survives_restart(tmp_path):
+    path = tmp_path / "catalog.sqlite3"
+    catalog = ArtworkCatalog(path)
+    catalog.upsert([make_artwork(str(i), 100 + i, ["blue"]) for i in range(5)])
+    catalog.upsert([make_artwork("0", 100, ["blue"])])  # replaced, keeps its position
+    expected, revision = ranking(catalog), catalog.revision
+
+    reopened = ArtworkCatalog(path)
+    assert ranking(reopened) == expected
+    assert reopened.revision == revision
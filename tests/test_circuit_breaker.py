@@ -0,0 +1,164 @@
+"""
+Circuit breaker transitions, probe-slot release on cancel, and failures
+during a streamed completion reaching the breaker.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.services import openai_client
+from app.services.openai_client import CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(openai_client, "time", clock)
+    return clock
+
+@pytest.fixture
+def breaker(monkeypatch, clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    monkeypatch.setattr(openai_client, "_breaker", breaker)
+    monkeypatch.setattr(openai_client, "backoff_delay", lambda attempt: 0)
+    monkeypatch.setattr(openai_client.config, "LLM_MAX_ATTEMPTS", 1)
+    return breaker
+
+
+def test_opens_after_threshold_and_fails_fast(breaker, clock):
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.retry_after() == 30
+
+    clock.now += 10
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.retry_after() == 20
+
+def test_half_open_lets_one_probe_through(breaker, clock):
+    for _ in range(2):
+        breaker.record_failure()
+    clock.now += 30
+
+    breaker.before_call()  # the probe
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+def test_failed_probe_reopens(breaker, clock):
+    for _ in range(2):
+        breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.retry_after() == 30
+
+def test_cancelled_probe_releases_the_slot(breaker, clock):
+    for _ in range(2):
+        breaker.record_failure()
+    clock.now += 30
+
+    async def main():
+        task = asyncio.ensure_future(openai_client._with_resilience(lambda: asyncio.sleep(3600)))
+        await asyncio.sleep(0)
+        assert breaker.probe_in_flight
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert not breaker.probe_in_flight
+    breaker.before_call()  # a new probe is allowed
+
+def test_non_transient_error_does_not_count(breaker):
+    async def bad_request():
+        raise ValueError("400")
+
+    with pytest.raises(ValueError):
+        asyncio.run(openai_client._with_resilience(bad_request))
+    assert breaker.failures == 0
+
+
+class FakeStream:
+    def __init__(self, deltas, error=None):
+        self.deltas = deltas
+        self.error = error
+        self.closed = False
+
+    async def _chunks(self):
+        for text in self.deltas:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+        if self.error is not None:
+            raise self.error
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def close(self):
+        self.closed = True
+
+def fake_client(stream: FakeStream):
+    async def create(**kwargs):
+        return stream
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+async def collect(stream: FakeStream):
+    out = []
+    async for text in openai_client.stream_chat_text([], temperature=0):
+        out.append(text)
+    return out
+
+
+def test_mid_stream_timeout_counts_as_failure(breaker, monkeypatch):
+    stream = FakeStream(["{", '"a"'], httpx.ReadTimeout("read timed out"))
+    monkeypatch.setattr(openai_client, "get_llm_client", lambda: fake_client(stream))
+
+    for _ in range(2):
+        with pytest.raises(httpx.ReadTimeout):
+            asyncio.run(collect(stream))
+    assert stream.closed
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(collect(stream))
+
+def test_completed_stream_keeps_circuit_closed(breaker, monkeypatch):
+    stream = FakeStream(["{", "}"])
+    monkeypatch.setattr(openai_client, "get_llm_client", lambda: fake_client(stream))
+    assert asyncio.run(collect(stream)) == ["{", "}"]
+    assert breaker.state == "closed" and breaker.failures == 0
+
+def test_stream_probe_outcome_decides_half_open(breaker, clock, monkeypatch):
+    for _ in range(2):
+        breaker.record_failure()
+    clock.now += 30
+
+    stream = FakeStream(["{"], httpx.RemoteProtocolError("connection dropped"))
+    monkeypatch.setattr(openai_client, "get_llm_client", lambda: fake_client(stream))
+    with pytest.raises(httpx.RemoteProtocolError):
+        asyncio.run(collect(stream))
+    assert breaker.state == "open"
+
+    clock.now += 30
+    stream = FakeStream(["{", "}"])
+    monkeypatch.setattr(openai_client, "get_llm_client", lambda: fake_client(stream))
+    asyncio.run(collect(stream))
+    assert breaker.state == "closed"
@@ -0,0 +1,51 @@
+"""
+A cached A-vs-B comparison must never answer B-vs-A: the free text names
+the sides by letter.
+"""
+import asyncio
+from typing import Any, Dict
+
+from app.models.artwork import Artwork
+from app.models.user_profile import UserProfile
+from app.services import ai_buddy
+
+
+def make_artwork(aid: str, price: float) -> Artwork:
+    return Artwork(
+        id=aid, title=f"Work {aid}", artistName="Lee", year=2020, price=price, currency="SGD",
+        size={"width": 50, "height": 40, "unit": "cm"}, tags=["ocean"], story="Waves.",
+        imageUrl="", audioStoryUrl="",
+    )
+
+USER = UserProfile(style=["abstract"], mood=["calm"], colors=["blue"], themes=["ocean"],
+                   budget={"min": 0, "max": 1000}, space="bedroom")
+
+
+def test_compare_ab_and_ba_are_answered_separately(monkeypatch):
+    store: Dict[str, Any] = {}
+    calls = []
+
+    async def fake_llm(prompt: str, schema):
+        # the cheaper artwork wins, named by its side in this prompt
+        cheap_side = "A" if prompt.index("- id: cheap") < prompt.index("- id: dear") else "B"
+        calls.append(cheap_side)
+        return {
+            "verdict": cheap_side,
+            "why": f"{cheap_side} is cheaper.",
+            "differences": [{"aspect": "Price", "A": "x", "B": "y"}],
+            "confidence_tip": f"On a budget, go with {cheap_side}.",
+        }
+
+    monkeypatch.setattr(ai_buddy, "call_llm_json", fake_llm)
+    monkeypatch.setattr(ai_buddy, "cache_get", lambda key, ttl_seconds=None: store.get(key))
+    monkeypatch.setattr(ai_buddy, "cache_set", lambda key, value: store.__setitem__(key, value))
+
+    cheap, dear = make_artwork("cheap", 100), make_artwork("dear", 900)
+    ab = asyncio.run(ai_buddy.compare_artworks(USER, cheap, dear))
+    ba = asyncio.run(ai_buddy.compare_artworks(USER, dear, cheap))
+    again = asyncio.run(ai_buddy.compare_artworks(USER, cheap, dear))
+
+    assert (ab["verdict"], ab["why"], ab["confidence_tip"]) == ("A", "A is cheaper.", "On a budget, go with A.")
+    assert (ba["verdict"], ba["why"], ba["confidence_tip"]) == ("B", "B is cheaper.", "On a budget, go with B.")
+    assert again == ab
+    assert calls == ["A", "B"]
@@ -0,0 +1,77 @@
+"""
+StreamingJSONParser feeds every LLM call in the app: the same events must
+come out whether the completion arrives whole or a character at a time.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+from pydantic import BaseModel
+
+from app.services.json_stream import RESET, StreamingJSONParser, parse_json_object
+
+
+class Reply(BaseModel):
+    summary: str
+    bullets: List[str]
+    score: int = 0
+
+
+def events(text: str, chunk: int, schema=None) -> Tuple[List[Tuple[Any, Any]], StreamingJSONParser]:
+    parser = StreamingJSONParser(schema)
+    out = []
+    for i in range(0, len(text), chunk):
+        out.extend(parser.feed(text[i:i + chunk]))
+    return out, parser
+
+
+CASES = [
+    # (name, completion, expected events, expected result or None if incomplete)
+    ("plain", '{"a": 1, "b": [1, {"c": "}"}]}',
+     [("a", 1), ("b", [1, {"c": "}"}])], {"a": 1, "b": [1, {"c": "}"}]}),
+    ("think block", '<think>maybe {"a": 0}</think>{"a": 2}',
+     [("a", 2)], {"a": 2}),
+    ("fence and prose", 'Sure! ```json\n{"a": "x"}\n``` done {"ignored": 1}',
+     [("a", "x")], {"a": "x"}),
+    ("escaped key and value", r'{"a\"b": "c\\\"}", "d": null}',
+     [('a"b', 'c\\"}'), ("d", None)], {'a"b': 'c\\"}', "d": None}),
+    ("false start before fields", '{the} JSON: {"a": 1}',
+     [("a", 1)], {"a": 1}),
+    ("false start after fields", '{"a": 1, oops} {"b": 2}',
+     [("a", 1), (RESET, None), ("b", 2)], {"b": 2}),
+    ("field named reset", '{"reset": true, "a": 1}',
+     [("reset", True), ("a", 1)], {"reset": True, "a": 1}),
+    ("unterminated", '{"a": 1, "b": [2',
+     [("a", 1)], None),
+]
+
+@pytest.mark.parametrize("name,text,expected,result", CASES, ids=[c[0] for c in CASES])
+@pytest.mark.parametrize("chunk", [1, 3, 1000])
+def test_stream_events(name: str, text: str, expected, result: Optional[Dict[str, Any]], chunk: int):
+    out, parser = events(text, chunk)
+    assert out == expected
+    assert parser.done == (result is not None)
+    if result is not None:
+        assert parser.result() == result
+    else:
+        with pytest.raises(ValueError):
+            parser.result()
+
+def test_reset_is_not_a_string():
+    out, _ = events('{"reset": 1}', 1)
+    assert out[0][0] == "reset" and out[0][0] is not RESET
+
+def test_schema_drops_invalid_fields_only():
+    out, parser = events('{"summary": "ok", "bullets": "not a list", "score": "7", "extra": 1}', 2, Reply)
+    # "7" coerces to the field type, the bad list is dropped, unknown fields pass
+    assert out == [("summary", "ok"), ("score", 7), ("extra", 1)]
+    assert set(parser.errors) == {"bullets"}
+
+def test_errors_cleared_on_false_start():
+    _, parser = events('{"bullets": 5, oops} {"summary": "ok"}', 1, Reply)
+    assert parser.result() == {"summary": "ok"}
+    assert parser.errors == {}
+
+def test_parse_json_object():
+    assert parse_json_object('<think>x</think>```json\n{"a": [1]}\n```') == {"a": [1]}
+    with pytest.raises(ValueError):
+        parse_json_object("no json here")
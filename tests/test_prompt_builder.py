@@ -0,0 +1,31 @@
+"""
+Prompts must carry prices, budgets and sizes exactly as given.
+"""
+from app.models.artwork import Artwork
+from app.models.user_profile import UserProfile
+from app.services.prompt_builder import artwork_lines, candidate_table, profile_lines
+
+
+def make_artwork(price, width=123.456789, height=80) -> Artwork:
+    return Artwork(
+        id="a1", title="Harbour", artistName="Lee", year=2020, price=price, currency="USD",
+        size={"width": width, "height": height, "unit": "cm"}, tags=["ocean"], story="Waves.",
+        imageUrl="", audioStoryUrl="",
+    )
+
+
+def test_seven_digit_price_is_exact():
+    a = make_artwork(1250000)
+    assert "- price: 1250000 USD" in artwork_lines(a, 100)
+    assert "|1250000 USD|" in candidate_table([a], 1000)
+
+def test_fractional_values_are_not_rounded():
+    a = make_artwork(1999.99)
+    lines = artwork_lines(a, 100)
+    assert "- price: 1999.99 USD" in lines
+    assert "- size: 123.456789×80cm" in lines
+
+def test_budget_is_exact():
+    user = UserProfile(style=[], mood=[], colors=[], themes=[],
+                       budget={"min": 1000000, "max": 2500000}, space="bedroom")
+    assert "- budget: 1000000 to 2500000" in profile_lines(user)